@@ -1,10 +1,50 @@
 """AI Agent for processing user requests and generating responses"""
 import asyncio
+import functools
+import logging
+import re
 
 from domain.constants import EVENT_TYPE_AI_RESPONSE
-from domain.models import AIResponseEvent
+from domain.models import AIRequestEvent, AIResponseEvent
 from events.publisher import EventPublisher
 
+logger = logging.getLogger(__name__)
+
+# Number of distinct messages whose intent (and reply) is remembered
+INTENT_CACHE_SIZE = 128
+
+# Longer messages skip both caches, so they can't pin large strings in memory
+INTENT_CACHE_MAX_LEN = 1024
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """Build a regex matching any of words, factored by common prefix
+    
+    A flat "a|b|c" alternation makes the regex engine retry every keyword at
+    every position; the trie form ("as(?:ync(?:hronous|io)?)") checks each
+    character once, so scanning cost stays flat as the keyword table grows.
+    Optional suffixes are greedy, so the longest of these words at a position
+    is matched; ranking between word lists is left to the caller.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end of a keyword
+    
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if "" in node:
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+    
+    return build(trie)
+
 
 class MockedAIAgent:
     """Mocked AI agent that processes requests using intent matching"""
@@ -33,21 +73,67 @@ class MockedAIAgent:
         }
     }
     
-    def __init__(self, publisher: EventPublisher) -> None:
+    def __init__(self, publisher: EventPublisher, simulate_latency: float = 0.0) -> None:
         self.publisher = publisher
+        # Optional artificial delay (seconds) to mimic a real model; off by default
+        self._latency = simulate_latency
+        
+        # Intents in table order; earlier intents win
+        self._intent_names = list(self.intents)
+        
+        # Compile all keywords into one pattern scanned in a single pass, with
+        # one prefix-factored group per intent in table order. Alternation
+        # tries groups left to right, so at any position the first-ranked
+        # intent with a keyword there is reported, even if a later intent has
+        # a longer keyword starting at the same spot. The lookahead makes the
+        # pattern zero-width, so a keyword starting inside another match
+        # ("py" in "happy") is still found.
+        # No word boundaries: keywords match as substrings ("WebSockets",
+        # "ws://"). Case-insensitive matching on the raw message avoids
+        # allocating a lowercased copy per request.
+        groups = (
+            "(" + _trie_pattern([keyword.lower() for keyword in intent_data["keywords"]]) + ")"
+            for intent_data in self.intents.values()
+        )
+        self._scanner = re.compile("(?=" + "|".join(groups) + ")", re.IGNORECASE | re.ASCII)
+        
+        # Chat traffic is repetitive ("hi", "help"), so remember recent results
+        # for short messages
+        self._detect_cached = functools.lru_cache(maxsize=INTENT_CACHE_SIZE)(self._scan)
+        # Same for the whole intent -> reply step used by process_request
+        self._respond_cached = functools.lru_cache(maxsize=INTENT_CACHE_SIZE)(self._respond)
     
     def detect_intent(self, message: str) -> str:
-        """Detect intent from user message based on keywords"""
-        message_lower = message.lower()
+        """Detect intent from user message based on keywords
         
-        # Check each intent's keywords
-        for intent_name, intent_data in self.intents.items():
-            for keyword in intent_data["keywords"]:
-                if keyword in message_lower:
-                    return intent_name
+        When keywords of several intents appear, the intent listed first in
+        `intents` wins, wherever its keyword sits in the message.
+        """
+        if len(message) > INTENT_CACHE_MAX_LEN:
+            return self._scan(message)
+        return self._detect_cached(message)
+    
+    def _scan(self, message: str) -> str:
+        """Run the keyword scanner over the raw message"""
+        best = "default"
+        best_rank = len(self._intent_names)
+        for match in self._scanner.finditer(message):
+            # The matching group's index is the intent's rank
+            rank = match.lastindex - 1
+            if rank < best_rank:
+                best, best_rank = self._intent_names[rank], rank
+                if rank == 0:
+                    break
+        return best
+    
+    def _respond(self, message: str) -> tuple[str, str]:
+        """Detect the intent of a message and build the reply for it
         
-        # Default intent if no match
-        return "default"
+        Keyed by the raw message rather than a normalized form, since the
+        default reply quotes the message back.
+        """
+        intent = self.detect_intent(message)
+        return intent, self.get_response(intent, message)
     
     def get_response(self, intent: str, original_message: str) -> str:
         """Get response based on detected intent"""
@@ -56,21 +142,23 @@ class MockedAIAgent:
         else:
             return f"I'm a mocked AI assistant in development. You asked about: '{original_message}'. I can help with questions about Python, async programming, WebSockets, event-driven architecture, and databases. Ask me anything!"
     
-    async def process_request(self, request_event: dict) -> None:
+    async def process_request(self, request_event: AIRequestEvent) -> None:
         """Process AI request and publish response"""
-        user_message: str = request_event.get("text", "")
+        user_message = request_event.text
         
         try:
-            # Detect intent
-            intent = self.detect_intent(user_message)
-            print(f"Detected intent: {intent}")
+            # Detect intent and pick the response (cached for short messages)
+            if len(user_message) > INTENT_CACHE_MAX_LEN:
+                intent, ai_response = self._respond(user_message)
+            else:
+                intent, ai_response = self._respond_cached(user_message)
+            logger.debug("Detected intent: %s", intent)
             
-            # Simulate AI processing
-            await asyncio.sleep(0.5)
+            # Simulate AI processing only when asked to
+            if self._latency > 0:
+                await asyncio.sleep(self._latency)
             
-            # Get response based on intent
-            ai_response: str = self.get_response(intent, user_message)
-            print(f"AI response: {ai_response}")
+            logger.debug("AI response: %s", ai_response)
             
             # Publish AI response event
             response_event = AIResponseEvent(
@@ -81,7 +169,7 @@ class MockedAIAgent:
             )
             await self.publisher.publish(response_event)
         except Exception as e:
-            print(f"Error processing AI request: {e}")
+            logger.error("Error processing AI request: %s", e)
             error_event = AIResponseEvent(
                 type=EVENT_TYPE_AI_RESPONSE,
                 text=f"Error processing request: {str(e)}"
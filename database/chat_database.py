@@ -1,31 +1,148 @@
 """Database access layer for chat system"""
+import asyncio
+import logging
+import sqlite3
+import threading
 import uuid
-import aiosqlite
+from collections import OrderedDict
+from typing import Any, Callable, Sequence, TypeVar
 
 from domain.constants import CONVERSATION_DEFAULT
 from domain.models import Message, HistoryMessage
 
+logger = logging.getLogger(__name__)
+
 # Database path
 DB_PATH = "chat_history.db"
 
+# Maximum number of pending messages written in a single transaction
+MAX_BATCH = 100
+
+# Maximum number of username -> user_id entries kept in memory
+USER_CACHE_SIZE = 1024
+
+# Maximum number of cached conversation history results
+HISTORY_CACHE_SIZE = 64
+
+# Seconds close() waits for queued rows, and then for the connection, before giving up
+CLOSE_TIMEOUT = 5.0
+
+# Size of the connection's prepared statement cache (stdlib default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Hot-path statements, defined once so every call reuses the same prepared
+# statement from the connection's cache
+_SQL_INSERT_PARTICIPANT = "INSERT OR IGNORE INTO conversation_participants (conversation_id, user_id) VALUES (?, ?)"
+_SQL_INSERT_MSG = "INSERT INTO messages (conversation_id, sender_id, sender_name, text, message_type) VALUES (?, ?, ?, ?, ?)"
+_SQL_UPDATE_CONV = "UPDATE conversations SET updated_at = CURRENT_TIMESTAMP WHERE conversation_id = ?"
+_SQL_UPSERT_USER = (
+    "INSERT INTO users (user_id, username) VALUES (?, ?) "
+    "ON CONFLICT(username) DO UPDATE SET last_activity = CURRENT_TIMESTAMP "
+    "RETURNING user_id"
+)
+_SQL_SELECT_HISTORY = (
+    "SELECT sender_name, text, message_type, created_at FROM messages "
+    "WHERE conversation_id = ? ORDER BY created_at ASC, id ASC LIMIT ?"
+)
+_SQL_SEARCH = (
+    "SELECT m.sender_name, m.text, m.message_type, m.created_at FROM messages_fts f "
+    "JOIN messages m ON m.id = f.rowid WHERE messages_fts MATCH ? ORDER BY bm25(messages_fts) LIMIT ?"
+)
+
+T = TypeVar("T")
+
+# (conversation_id, user_id) row queued for conversation_participants
+Participant = tuple[str, str]
+
+# Queued by flush(); resolved once every row queued before it has been written
+FlushMarker = asyncio.Future
+
 
 class ChatDatabase:
-    """Manages SQLite database for chat history and sessions"""
-    
+    """Manages SQLite database for chat history and sessions
+
+    Uses a single stdlib sqlite3 connection in autocommit mode. Every public
+    operation runs as one blocking function on a worker thread via
+    asyncio.to_thread (one thread hop per operation, not per statement), and a
+    lock serializes access to the shared connection.
+    """
+
     def __init__(self, db_path: str = DB_PATH) -> None:
         self.db_path = db_path
-        self.conn: aiosqlite.Connection | None = None
-    
-    async def init(self) -> None:
-        """Initialize database and create tables"""
-        self.conn = await aiosqlite.connect(self.db_path)
+        self.conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        # Messages and participants waiting to be written by the background writer task
+        self._pending: asyncio.Queue[Message | Participant | FlushMarker] = asyncio.Queue()
+        self._writer_task: asyncio.Task | None = None
+        # username -> user_id (LRU); user ids never change once created
+        self._user_cache: OrderedDict[str, str] = OrderedDict()
+        # (conversation_id, limit, version) -> history (LRU). The writer bumps a
+        # conversation's version after committing to it, so stale entries are
+        # never hit again and age out.
+        self._history_cache: OrderedDict[tuple[str, int, int], list[HistoryMessage]] = OrderedDict()
+        self._conv_version: dict[str, int] = {}
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run a blocking database function on a worker thread"""
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    def _locked(self, fn: Callable[..., T], *args: Any) -> T:
+        """Call fn while holding the connection lock (runs on worker thread)"""
+        with self._lock:
+            return fn(*args)
+
+    def _exec_batch(self, statements: Sequence[tuple[str, Sequence[Sequence[Any]]]]) -> None:
+        """Execute (sql, rows) pairs with executemany inside one transaction"""
         assert self.conn is not None
-        
+        self.conn.execute("BEGIN")
+        try:
+            for sql, rows in statements:
+                if rows:
+                    self.conn.executemany(sql, rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    async def init(self) -> None:
+        """Initialize database and create tables
+
+        The connection runs in WAL mode with synchronous=NORMAL: commits no longer
+        fsync the database file (only WAL checkpoints do) and readers don't block
+        the writer. Trade-off: a power loss or OS crash can drop the most recently
+        committed messages, but the database itself stays consistent - acceptable
+        for a chat log.
+        """
+        await self._run(self._init_schema)
+
+        # Start background writer that batches message inserts
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        logger.info("Database initialized successfully")
+
+    def _init_schema(self) -> None:
+        """Open the connection, apply PRAGMAs and create tables (worker thread)"""
+        self.conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+
         # Enable foreign keys
-        await self.conn.execute("PRAGMA foreign_keys = ON")
-        
+        self.conn.execute("PRAGMA foreign_keys = ON")
+
+        # Write-ahead log with relaxed fsync, larger cache, temp tables in memory
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA temp_store = MEMORY")
+        self.conn.execute("PRAGMA cache_size = -64000")  # 64 MB
+        self.conn.execute("PRAGMA mmap_size = 268435456")  # 256 MB
+        self.conn.execute("PRAGMA wal_autocheckpoint = 1000")  # pages
+
+        self.conn.execute("BEGIN")
+
         # Create users table (each user has a profile)
-        await self.conn.execute("""
+        self.conn.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 user_id TEXT PRIMARY KEY,
                 username TEXT NOT NULL UNIQUE,
@@ -33,18 +150,18 @@ class ChatDatabase:
                 last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        
+
         # Create conversations table (shared conversations)
-        await self.conn.execute("""
+        self.conn.execute("""
             CREATE TABLE IF NOT EXISTS conversations (
                 conversation_id TEXT PRIMARY KEY,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        
+
         # Create conversation participants table (tracks which users are in which conversations)
-        await self.conn.execute("""
+        self.conn.execute("""
             CREATE TABLE IF NOT EXISTS conversation_participants (
                 conversation_id TEXT NOT NULL,
                 user_id TEXT NOT NULL,
@@ -54,9 +171,9 @@ class ChatDatabase:
                 FOREIGN KEY (user_id) REFERENCES users(user_id)
             )
         """)
-        
+
         # Create messages table (all messages in all conversations)
-        await self.conn.execute("""
+        self.conn.execute("""
             CREATE TABLE IF NOT EXISTS messages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 conversation_id TEXT NOT NULL,
@@ -69,95 +186,260 @@ class ChatDatabase:
                 FOREIGN KEY (sender_id) REFERENCES users(user_id)
             )
         """)
-        
-        # Create index for faster queries
-        await self.conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_messages_conversation 
-            ON messages(conversation_id, created_at)
+
+        # Covering index for history reads: the query is answered from the index
+        # alone. It has the same prefix as the old narrow index, which it replaces.
+        # id breaks ties between messages saved within the same second.
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_messages_conv_covering
+            ON messages(conversation_id, created_at, id, sender_name, text, message_type)
         """)
-        
+        self.conn.execute("DROP INDEX IF EXISTS idx_messages_conversation")
+
         # Create index for username lookups
-        await self.conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_users_username 
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_users_username
             ON users(username)
         """)
-        
+
+        # Full-text index over messages.text (external content, kept in sync by triggers)
+        fts_exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+        ).fetchone()
+        self.conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                text,
+                content = messages,
+                content_rowid = id,
+                tokenize = "unicode61 remove_diacritics 2"
+            )
+        """)
+        self.conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, text) VALUES (new.id, new.text);
+            END
+        """)
+        self.conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END
+        """)
+        self.conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                INSERT INTO messages_fts (rowid, text) VALUES (new.id, new.text);
+            END
+        """)
+        if not fts_exists:
+            # Index messages stored before the FTS table existed
+            self.conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
         # Create default conversation (main chat room)
-        await self.conn.execute("""
+        self.conn.execute("""
             INSERT OR IGNORE INTO conversations (conversation_id) VALUES (?)
         """, (CONVERSATION_DEFAULT,))
-        
-        await self.conn.commit()
-        print("Database initialized successfully")
-    
+
+        self.conn.execute("COMMIT")
+
     async def close(self) -> None:
-        """Close database connection"""
+        """Flush pending writes and close database connection
+
+        Each step is bounded by CLOSE_TIMEOUT, so a dead or stuck writer can't
+        hang shutdown; rows still queued at that point are dropped with a warning.
+        """
+        if self._writer_task:
+            if not self._writer_task.done():
+                try:
+                    # Write everything, including rows queued while waiting
+                    await asyncio.wait_for(self._pending.join(), timeout=CLOSE_TIMEOUT)
+                except TimeoutError:
+                    logger.warning("Writer did not finish within %.1fs", CLOSE_TIMEOUT)
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error("Writer task failed: %s", e)
+            self._writer_task = None
+            self._drop_pending()
         if self.conn:
-            await self.conn.close()
-    
+            conn, self.conn = self.conn, None
+            try:
+                await asyncio.wait_for(self._run(self._optimize_and_close, conn), timeout=CLOSE_TIMEOUT)
+            except TimeoutError:
+                # The worker thread still closes it once the stuck write returns
+                logger.warning("Database connection still busy; not waiting for it to close")
+
+    def _drop_pending(self) -> None:
+        """Discard rows the writer never took, releasing any flush() waiters"""
+        dropped = 0
+        while not self._pending.empty():
+            item = self._pending.get_nowait()
+            self._pending.task_done()
+            if isinstance(item, FlushMarker):
+                if not item.done():
+                    item.set_result(None)
+            else:
+                dropped += 1
+        if dropped:
+            logger.warning("Closing with %d unwritten row(s)", dropped)
+
+    def _optimize_and_close(self, conn: sqlite3.Connection) -> None:
+        """Let SQLite refresh planner statistics, then close (worker thread)"""
+        conn.execute("PRAGMA optimize")
+        conn.close()
+
+    async def flush(self) -> None:
+        """Wait until every row queued before this call has been written
+
+        Rows queued afterwards are not waited for, so a reader is never held up
+        by steady chat traffic behind it.
+        """
+        if self._writer_task is None:
+            return
+        marker: FlushMarker = asyncio.get_running_loop().create_future()
+        self._pending.put_nowait(marker)
+        await marker
+
+    async def _writer_loop(self) -> None:
+        """Continuously drain pending messages and write them in batches"""
+        while True:
+            # Wait for one item, then take whatever else queued up meanwhile.
+            # A flush marker ends the batch, so it only waits for rows before it.
+            items = [await self._pending.get()]
+            while len(items) < MAX_BATCH and not isinstance(items[-1], FlushMarker):
+                try:
+                    items.append(self._pending.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            batch = [item for item in items if not isinstance(item, FlushMarker)]
+
+            try:
+                try:
+                    # One thread hop covers BEGIN / executemany / COMMIT
+                    if batch:
+                        await self._run(self._write_batch, batch)
+                    written = batch
+                except sqlite3.Error as e:
+                    # One bad row rolls back the whole transaction: retry row by
+                    # row so only the offending rows are dropped
+                    logger.warning("Batch of %d row(s) failed (%s); retrying one at a time", len(batch), e)
+                    written = await self._run(self._write_each, batch)
+                # Invalidate cached history of every conversation written to
+                for conversation_id in {m.conversation_id for m in written if isinstance(m, Message)}:
+                    self._conv_version[conversation_id] = self._conv_version.get(conversation_id, 0) + 1
+            except Exception as e:
+                logger.error("Error writing %d row(s) to database: %s", len(batch), e)
+            finally:
+                for item in items:
+                    if isinstance(item, FlushMarker) and not item.done():
+                        item.set_result(None)
+                    self._pending.task_done()
+
+    def _write_batch(self, batch: list[Message | Participant]) -> None:
+        """Write a batch of queued rows inside a single transaction (worker thread)"""
+        messages = [item for item in batch if isinstance(item, Message)]
+        participants = [item for item in batch if not isinstance(item, Message)]
+        # Update conversation updated_at timestamp once per touched conversation
+        conversation_ids = {m.conversation_id for m in messages}
+        self._exec_batch([
+            # Joining a conversation twice is a no-op
+            (_SQL_INSERT_PARTICIPANT, participants),
+            (_SQL_INSERT_MSG, [(m.conversation_id, m.sender_id, m.sender, m.text, m.msg_type) for m in messages]),
+            (_SQL_UPDATE_CONV, [(conversation_id,) for conversation_id in conversation_ids]),
+        ])
+
+    def _write_each(self, batch: list[Message | Participant]) -> list[Message | Participant]:
+        """Write rows in separate transactions, logging and skipping failures (worker thread)
+
+        Returns the rows that were written.
+        """
+        written = []
+        for item in batch:
+            try:
+                self._write_batch([item])
+            except sqlite3.Error as e:
+                logger.error("Dropping row that failed to write (%r): %s", item, e)
+            else:
+                written.append(item)
+        return written
+
     async def get_or_create_user(self, username: str) -> str:
-        """Get existing user_id by username or create new user, returns user_id"""
-        assert self.conn is not None
-        
-        # Try to get existing user
-        cursor = await self.conn.execute(
-            "SELECT user_id FROM users WHERE username = ?",
-            (username,)
-        )
-        row = await cursor.fetchone()
-        if row:
-            # Update last_activity
-            await self.conn.execute(
-                "UPDATE users SET last_activity = CURRENT_TIMESTAMP WHERE username = ?",
-                (username,)
-            )
-            await self.conn.commit()
-            return row[0]
-        
-        # Create new user
-        user_id = str(uuid.uuid4())
-        await self.conn.execute(
-            "INSERT INTO users (user_id, username) VALUES (?, ?)",
-            (user_id, username)
-        )
-        await self.conn.commit()
+        """Get existing user_id by username or create new user, returns user_id
+
+        Cached users are returned without touching SQLite (last_activity is only
+        refreshed on a cache miss).
+        """
+        user_id = self._user_cache.get(username)
+        if user_id is not None:
+            self._user_cache.move_to_end(username)
+            return user_id
+
+        user_id = await self._run(self._upsert_user, username)
+        self._user_cache[username] = user_id
+        if len(self._user_cache) > USER_CACHE_SIZE:
+            self._user_cache.popitem(last=False)
         return user_id
-    
+
+    def _upsert_user(self, username: str) -> str:
+        assert self.conn is not None
+        # Create the user or refresh last_activity, returning the stored id either way
+        row = self.conn.execute(_SQL_UPSERT_USER, (str(uuid.uuid4()), username)).fetchone()
+        return row[0]
+
     async def add_user_to_conversation(self, user_id: str, conversation_id: str = CONVERSATION_DEFAULT) -> None:
-        """Add user to a conversation if not already in it"""
+        """Queue user to join a conversation (ignored if already in it)"""
+        await self._pending.put((conversation_id, user_id))
+
+    async def save_message(self, message: Message) -> None:
+        """Queue message for the background writer (written in batched transactions)"""
+        await self._pending.put(message)
+
+    async def get_conversation_history(self, conversation_id: str = CONVERSATION_DEFAULT, limit: int = 50) -> list[HistoryMessage]:
+        """Get chat history for a conversation (all messages regardless of user)
+
+        Each call returns a new list, but the frozen HistoryMessage rows in it
+        are shared with the history cache.
+        """
         assert self.conn is not None
-        try:
-            await self.conn.execute(
-                "INSERT INTO conversation_participants (conversation_id, user_id) VALUES (?, ?)",
-                (conversation_id, user_id)
+        # Make sure queued messages are visible before reading
+        await self.flush()
+
+        key = (conversation_id, limit, self._conv_version.get(conversation_id, 0))
+        cached = self._history_cache.get(key)
+        if cached is not None:
+            self._history_cache.move_to_end(key)
+            return list(cached)
+
+        rows = await self._run(self._fetch_history, conversation_id, limit)
+        history = [
+            HistoryMessage(
+                sender=row[0],
+                text=row[1],
+                msg_type=row[2],
+                timestamp=row[3]
             )
-            await self.conn.commit()
-        except:
-            # User already in conversation
-            pass
-    
-    async def save_message(self, message: Message) -> None:
-        """Save message to database in a conversation"""
+            for row in rows
+        ]
+        self._history_cache[key] = history
+        if len(self._history_cache) > HISTORY_CACHE_SIZE:
+            self._history_cache.popitem(last=False)
+        return list(history)
+
+    def _fetch_history(self, conversation_id: str, limit: int) -> list[tuple]:
         assert self.conn is not None
-        await self.conn.execute(
-            "INSERT INTO messages (conversation_id, sender_id, sender_name, text, message_type) VALUES (?, ?, ?, ?, ?)",
-            (message.conversation_id, message.sender_id, message.sender, message.text, message.msg_type)
-        )
-        # Update conversation updated_at timestamp
-        await self.conn.execute(
-            "UPDATE conversations SET updated_at = CURRENT_TIMESTAMP WHERE conversation_id = ?",
-            (message.conversation_id,)
-        )
-        await self.conn.commit()
-    
-    async def get_conversation_history(self, conversation_id: str = CONVERSATION_DEFAULT, limit: int = 50) -> list[HistoryMessage]:
-        """Get chat history for a conversation (all messages regardless of user)"""
+        return self.conn.execute(_SQL_SELECT_HISTORY, (conversation_id, limit)).fetchall()
+
+    async def search_messages(self, query: str, limit: int = 20) -> list[HistoryMessage]:
+        """Full-text search over message text, best BM25 matches first
+
+        query uses FTS5 MATCH syntax; a malformed query raises sqlite3.OperationalError.
+        """
         assert self.conn is not None
-        cursor = await self.conn.execute(
-            "SELECT sender_name, text, message_type, created_at FROM messages WHERE conversation_id = ? ORDER BY created_at ASC LIMIT ?",
-            (conversation_id, limit)
-        )
-        rows = await cursor.fetchall()
+        # Make sure queued messages are searchable
+        await self.flush()
+        rows = await self._run(self._search, query, limit)
         return [
             HistoryMessage(
                 sender=row[0],
@@ -167,7 +449,11 @@ class ChatDatabase:
             )
             for row in rows
         ]
-    
+
+    def _search(self, query: str, limit: int) -> list[tuple]:
+        assert self.conn is not None
+        return self.conn.execute(_SQL_SEARCH, (query, limit)).fetchall()
+
     async def get_conversation_history_dict(self, conversation_id: str = CONVERSATION_DEFAULT, limit: int = 50) -> list[dict]:
         """Get chat history as JSON-serializable dictionaries"""
         history = await self.get_conversation_history(conversation_id, limit)
@@ -18,3 +18,6 @@ CONVERSATION_DEFAULT: ConversationId = "default"
 EVENT_TYPE_USER_MESSAGE: EventType = "user_message"
 EVENT_TYPE_AI_RESPONSE: EventType = "ai_response"
 EVENT_TYPE_AI_REQUEST: EventType = "ai_request"
+
+# Chat command prefix that routes a message to the AI agent
+AIBOT_PREFIX = "/AIBot"
@@ -5,14 +5,14 @@ from fastapi import WebSocket
 from .constants import MessageType, EventType, MESSAGE_TYPE_USER, CONVERSATION_DEFAULT, ConversationId, EVENT_TYPE_USER_MESSAGE, EVENT_TYPE_AI_REQUEST, EVENT_TYPE_AI_RESPONSE
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """Represents a user in the chat system"""
     user_id: str
     username: str # corresponds to 'sender' in messages
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """Represents a message in the chat system"""
     sender_id: str
@@ -22,11 +22,12 @@ class Message:
     conversation_id: ConversationId = CONVERSATION_DEFAULT
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class HistoryMessage:
     """Message as it appears in conversation history (from database/persistence layer)
     
-    Represents a message retrieved from the database with timestamp.
+    Represents a message retrieved from the database with timestamp. Frozen,
+    because cached history results hand the same instances to every reader.
     
     Fields:
     - sender: Name of the message sender
@@ -40,7 +41,7 @@ class HistoryMessage:
     timestamp: str
 
 
-@dataclass
+@dataclass(slots=True)
 class UserMessageEvent:
     """Event: A user sends a message"""
     type: EventType = EVENT_TYPE_USER_MESSAGE
@@ -50,7 +51,7 @@ class UserMessageEvent:
     sender_ws: WebSocket | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AIRequestEvent:
     """Event: AI processing requested"""
     type: EventType = EVENT_TYPE_AI_REQUEST
@@ -60,10 +61,14 @@ class AIRequestEvent:
     sender_ws: WebSocket | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AIResponseEvent:
     """Event: AI response ready"""
     type: EventType = EVENT_TYPE_AI_RESPONSE
     text: str = ""
     original_message: str = ""
     detected_intent: str = ""
+
+
+# Any event that travels through the event queue
+Event = UserMessageEvent | AIRequestEvent | AIResponseEvent
@@ -1,74 +1,137 @@
 """Event consuming and handling for the chat system"""
 import asyncio
+import logging
 from fastapi import WebSocket
 
-from domain.constants import EVENT_TYPE_USER_MESSAGE, EVENT_TYPE_AI_REQUEST, EVENT_TYPE_AI_RESPONSE, MESSAGE_TYPE_USER, MESSAGE_TYPE_AI_RESPONSE, CONVERSATION_DEFAULT
-from domain.models import Message
+from domain.constants import MESSAGE_TYPE_USER, MESSAGE_TYPE_AI_RESPONSE, CONVERSATION_DEFAULT
+from domain.models import Message, Event, UserMessageEvent, AIRequestEvent, AIResponseEvent
 from websocket.connection_manager import ConnectionManager
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of queued events drained per wake-up of the consumer
+CONSUMER_BATCH = 64
+
 
 class EventConsumer:
     """Consumes events from the queue and handles them"""
     
-    def __init__(self, queue: asyncio.Queue[dict], db, ai_agent, connection_manager: ConnectionManager) -> None:
+    # Event class -> name of the handler method. Handlers are looked up by name
+    # so subclasses (and tests) can override them on the instance.
+    handlers: dict[type, str] = {
+        UserMessageEvent: "handle_user_message",
+        AIResponseEvent: "handle_ai_response",
+    }
+    
+    def __init__(self, queue: asyncio.Queue[Event], db, ai_agent, connection_manager: ConnectionManager, ai_user_id: str = "") -> None:
         self.queue = queue
         self.db = db
         self.ai_agent = ai_agent
         self.connection_manager = connection_manager
+        # AIBot's user_id, resolved once at startup (looked up lazily if not given)
+        self.ai_user_id = ai_user_id
     
     async def consume(self) -> None:
-        """Continuously consume and process events"""
+        """Continuously consume and process events
+        
+        After waiting for one event, whatever else is already queued (up to
+        CONSUMER_BATCH events) is taken without awaiting. The batch is handled
+        sequentially so events keep their publish order; consecutive user
+        messages from the same sender go out as a single broadcast frame.
+        """
         while True:
-            event = await self.queue.get()
-            await self.handle_event(event)
-            self.queue.task_done()
+            batch = [await self.queue.get()]
+            while len(batch) < CONSUMER_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            
+            for run in self._coalesce(batch):
+                if len(run) > 1:
+                    await self.handle_user_messages(run)
+                else:
+                    await self.handle_event(run[0])
+                for _ in run:
+                    self.queue.task_done()
     
-    async def handle_event(self, event: dict) -> None:
-        """Route event to appropriate handler"""
-        event_type: str = event.get("type", "")
-        
-        if event_type == EVENT_TYPE_USER_MESSAGE:
-            await self.handle_user_message(event)
-        elif event_type == EVENT_TYPE_AI_RESPONSE:
-            await self.handle_ai_response(event)
+    @staticmethod
+    def _coalesce(batch: list[Event]) -> list[list[Event]]:
+        """Split a batch into runs; only consecutive plain user messages with
+        the same sender socket share a run"""
+        runs: list[list[Event]] = []
+        for event in batch:
+            if (
+                runs
+                and type(event) is UserMessageEvent
+                and type(runs[-1][-1]) is UserMessageEvent
+                and event.sender_ws is runs[-1][-1].sender_ws
+            ):
+                runs[-1].append(event)
+            else:
+                runs.append([event])
+        return runs
+    
+    async def drain(self) -> None:
+        """Wait until every queued event has been handled"""
+        await self.queue.join()
     
-    async def handle_user_message(self, event: dict) -> None:
+    async def handle_event(self, event: Event) -> None:
+        """Route event to appropriate handler based on its class"""
+        handler_name = self.handlers.get(type(event))
+        if handler_name:
+            await getattr(self, handler_name)(event)
+    
+    async def handle_user_message(self, event: UserMessageEvent | AIRequestEvent) -> None:
         """Handle user message events and save to database"""
-        # Save to database
-        user_id: str = event.get("user_id", "")
-        sender: str = event.get("sender", "")
-        text: str = event.get("text", "")
+        await self._save_user_message(event)
+        
+        broadcast_message = {
+            "sender": event.sender,
+            "text": event.text
+        }
+        await self._broadcast_from(broadcast_message, event.sender_ws)
+    
+    async def handle_user_messages(self, events: list[UserMessageEvent]) -> None:
+        """Save a run of user messages from one sender and broadcast them as a
+        single "multi" frame whose payload lists the messages in order"""
+        for event in events:
+            await self._save_user_message(event)
         
-        if user_id and sender:
+        broadcast_message = {
+            "type": "multi",
+            "payload": [{"sender": event.sender, "text": event.text} for event in events]
+        }
+        await self._broadcast_from(broadcast_message, events[0].sender_ws)
+    
+    async def _save_user_message(self, event: UserMessageEvent | AIRequestEvent) -> None:
+        """Persist a user message (skipped when the sender is unknown)"""
+        if event.user_id and event.sender:
             message = Message(
-                sender_id=user_id,
-                sender=sender,
-                text=text,
+                sender_id=event.user_id,
+                sender=event.sender,
+                text=event.text,
                 msg_type=MESSAGE_TYPE_USER,
                 conversation_id=CONVERSATION_DEFAULT
             )
             await self.db.save_message(message)
-        
-        broadcast_message = {
-            "sender": sender,
-            "text": text
-        }
-        
-        # Send to all connected clients except sender
-        sender_ws: WebSocket | None = event.get("sender_ws")
+    
+    async def _broadcast_from(self, broadcast_message: dict, sender_ws: WebSocket | None) -> None:
+        """Send to all connected clients except the sender (if any)"""
         if sender_ws:
             await self.connection_manager.broadcast_except(broadcast_message, sender_ws)
         else:
             await self.connection_manager.broadcast(broadcast_message)
     
-    async def handle_ai_response(self, event: dict) -> None:
+    async def handle_ai_response(self, event: AIResponseEvent) -> None:
         """Handle AI response events and save to database"""
         # Save to database using AIBot's username
         try:
-            text: str = event.get("text", "")
-            ai_user_id = await self.db.get_or_create_user("AIBot")
+            text = event.text
+            if not self.ai_user_id:
+                self.ai_user_id = await self.db.get_or_create_user("AIBot")
             message = Message(
-                sender_id=ai_user_id,
+                sender_id=self.ai_user_id,
                 sender="AIBot",
                 text=text,
                 msg_type=MESSAGE_TYPE_AI_RESPONSE,
@@ -76,11 +139,11 @@ class EventConsumer:
             )
             await self.db.save_message(message)
         except Exception as e:
-            print(f"Error saving AI response to database: {e}")
+            logger.error("Error saving AI response to database: %s", e)
         
         broadcast_message = {
             "sender": "AIBot",
-            "text": event.get("text", "")
+            "text": event.text
         }
         
         # Send to all connected clients
@@ -90,21 +153,39 @@ class EventConsumer:
 class AIEventConsumer(EventConsumer):
     """Extended consumer that also handles AI requests"""
     
-    def __init__(self, queue: asyncio.Queue[dict], db, ai_agent, connection_manager: ConnectionManager) -> None:
-        super().__init__(queue, db, ai_agent, connection_manager)
+    handlers: dict[type, str] = {
+        **EventConsumer.handlers,
+        AIRequestEvent: "handle_ai_request",
+    }
+    
+    def __init__(self, queue: asyncio.Queue[Event], db, ai_agent, connection_manager: ConnectionManager, ai_user_id: str = "") -> None:
+        super().__init__(queue, db, ai_agent, connection_manager, ai_user_id)
+        # In-flight AI requests. The agent publishes its reply onto the same
+        # (bounded) queue this consumer drains, so it runs as a separate task:
+        # awaiting it here could block the consumer on a full queue forever.
+        self._ai_tasks: set[asyncio.Task] = set()
     
-    async def handle_event(self, event: dict) -> None:
-        """Route event to appropriate handler, including AI requests"""
-        event_type: str = event.get("type", "")
+    async def drain(self) -> None:
+        """Wait until the queue is empty and no AI request is still in flight
         
-        if event_type == EVENT_TYPE_USER_MESSAGE:
-            await self.handle_user_message(event)
-        elif event_type == EVENT_TYPE_AI_REQUEST:
-            request_text: str = event.get("text", "")
-            print(f"AI Request received: {request_text}")
-            await self.handle_user_message(event)  # Handle user message first
-            await self.ai_agent.process_request(event)
-        elif event_type == EVENT_TYPE_AI_RESPONSE:
-            response_text: str = event.get("text", "")
-            print(f"AI Response: {response_text}")
-            await self.handle_ai_response(event)
+        In-flight requests publish their reply after the queue may already
+        look idle, so keep going until both are settled.
+        """
+        while True:
+            await self.queue.join()
+            if not self._ai_tasks:
+                return
+            await asyncio.gather(*self._ai_tasks, return_exceptions=True)
+    
+    async def handle_ai_request(self, event: AIRequestEvent) -> None:
+        """Broadcast and save the request as a user message, then ask the AI agent"""
+        logger.debug("AI Request received: %s", event.text)
+        await self.handle_user_message(event)  # Handle user message first
+        task = asyncio.create_task(self.ai_agent.process_request(event))
+        self._ai_tasks.add(task)
+        task.add_done_callback(self._ai_tasks.discard)
+    
+    async def handle_ai_response(self, event: AIResponseEvent) -> None:
+        """Log the AI response, then save and broadcast it"""
+        logger.debug("AI Response: %s", event.text)
+        await super().handle_ai_response(event)
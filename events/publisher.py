@@ -1,43 +1,22 @@
 """Event publishing for the chat system"""
 import asyncio
 
-from domain.constants import EVENT_TYPE_USER_MESSAGE, EVENT_TYPE_AI_REQUEST, EVENT_TYPE_AI_RESPONSE
-from domain.models import UserMessageEvent, AIRequestEvent, AIResponseEvent
+from domain.models import Event
 
 
 class EventPublisher:
     """Publishes events to the event queue"""
     
-    def __init__(self, queue: asyncio.Queue[dict]) -> None:
+    def __init__(self, queue: asyncio.Queue[Event]) -> None:
         self.queue = queue
     
-    async def publish(self, event: UserMessageEvent | AIRequestEvent | AIResponseEvent | dict) -> None:
-        """Publish an event to the queue (accepts dataclass or dict)"""
-        # Convert dataclass to dict manually to avoid asdict() serialization issues
-        if isinstance(event, UserMessageEvent):
-            event_dict = {
-                "type": event.type,
-                "user_id": event.user_id,
-                "sender": event.sender,
-                "text": event.text,
-                "sender_ws": event.sender_ws,
-            }
-        elif isinstance(event, AIRequestEvent):
-            event_dict = {
-                "type": event.type,
-                "user_id": event.user_id,
-                "sender": event.sender,
-                "text": event.text,
-                "sender_ws": event.sender_ws,
-            }
-        elif isinstance(event, AIResponseEvent):
-            event_dict = {
-                "type": event.type,
-                "text": event.text,
-                "original_message": event.original_message,
-                "detected_intent": event.detected_intent,
-            }
-        else:
-            event_dict = event
-        await self.queue.put(event_dict)
-
+    async def publish(self, event: Event) -> None:
+        """Publish an event to the queue (the dataclass is passed through as-is)
+        
+        Enqueues without suspending when there is room; waits for free space
+        only when the queue is bounded and full.
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            await self.queue.put(event)
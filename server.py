@@ -1,19 +1,46 @@
 """Main FastAPI application - WebSocket chat server with event-driven architecture"""
 import asyncio
+import hashlib
+import logging
+import logging.handlers
+import os
+import queue
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket
-from fastapi.responses import FileResponse
+from pathlib import Path
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import Response
 import uvicorn
 
 from database.chat_database import ChatDatabase
+from domain.models import Event
 from events.publisher import EventPublisher
 from events.consumer import AIEventConsumer
 from ai.agent import MockedAIAgent
 from websocket.handler import handle_websocket_connection
 from websocket.connection_manager import ConnectionManager
 
+logger = logging.getLogger(__name__)
+
+# Number of consumer tasks sharing the event queue. More than one lets a slow
+# event (e.g. an AI request) overlap with others, but events are then no longer
+# handled strictly in publish order. Message writes still go through the
+# database's single background writer.
+CONSUMER_WORKERS = int(os.environ.get("CONSUMER_WORKERS", "1"))
+
+# Maximum number of pending events. When full, publishing from a WebSocket
+# handler waits, which stops reading from that socket (backpressure) instead of
+# letting memory grow without bound.
+EVENT_QUEUE_SIZE = 10_000
+
+# Browser client served at "/"; read once at startup. Resolved next to this
+# module so the server starts from any working directory.
+INDEX_PATH = Path(__file__).with_name("client.html")
+
+# Seconds to wait for queued events to be handled on shutdown
+SHUTDOWN_DRAIN_TIMEOUT = 5.0
+
 # Initialize event queue, database, publisher, AI agent, and connection manager
-event_queue: asyncio.Queue[dict] = asyncio.Queue()
+event_queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
 db = ChatDatabase()
 publisher = EventPublisher(event_queue)
 ai_agent = MockedAIAgent(publisher)
@@ -26,34 +53,70 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown"""
     global consumer
     
-    # Startup: Initialize database and start event consumer
+    # Startup: Load the client page, initialize database and start event consumer
+    app.state.index_html = INDEX_PATH.read_bytes()
+    app.state.index_etag = f'"{hashlib.md5(app.state.index_html, usedforsecurity=False).hexdigest()}"'
+    
     await db.init()
     
-    # Ensure AIBot user exists
-    await db.get_or_create_user("AIBot")
+    # Ensure AIBot user exists; its id is fixed for the process lifetime
+    ai_user_id = await db.get_or_create_user("AIBot")
     
     # Create consumer with AI agent support
-    consumer = AIEventConsumer(event_queue, db, ai_agent, connection_manager)
-    
-    # Start event consumer task (runs in background)
-    consumer_task = asyncio.create_task(consumer.consume())
-    print("Event consumer started")
+    consumer = AIEventConsumer(event_queue, db, ai_agent, connection_manager, ai_user_id)
     
-    yield
+    # Start event consumer tasks (run in background)
+    consumer_tasks = [asyncio.create_task(consumer.consume()) for _ in range(CONSUMER_WORKERS)]
+    logger.info("Event consumer started (%d worker(s))", CONSUMER_WORKERS)
     
-    # Shutdown: Stop consumer and close database
-    consumer_task.cancel()
-    await db.close()
-    print("Application shutdown complete")
+    try:
+        yield
+        
+        # Shutdown: let consumers finish queued events and pending AI replies (bounded)
+        try:
+            await asyncio.wait_for(consumer.drain(), timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        except TimeoutError:
+            logger.warning("Shutdown with %d unprocessed event(s)", event_queue.qsize())
+    finally:
+        # Stop consumers and wait for them before the database goes away
+        for consumer_task in consumer_tasks:
+            consumer_task.cancel()
+        await asyncio.gather(*consumer_tasks, return_exceptions=True)
+        await db.close()
+        logger.info("Application shutdown complete")
 
 
 app = FastAPI(lifespan=lifespan)
 
 
+def configure_logging() -> logging.handlers.QueueListener:
+    """Route root logging through a queue to stderr; returns the started listener
+    
+    WARNING and above by default; set LOG_LEVEL=INFO (or DEBUG for per-message
+    logs) when developing. Records are formatted and queued on the calling
+    thread and written by the listener thread, so a slow terminal or pipe never
+    blocks the event loop. Called only when run as a script, so importing this
+    module leaves logging alone; stop the listener to flush queued records.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logging.basicConfig(
+        level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=[logging.handlers.QueueHandler(log_queue)],
+    )
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    return listener
+
+
 @app.get("/")
-async def get_index():
-    """Serve the client HTML file"""
-    return FileResponse("client.html")
+async def get_index(request: Request) -> Response:
+    """Serve the client HTML file from memory, answering 304 when unchanged"""
+    etag: str = app.state.index_etag
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(app.state.index_html, media_type="text/html", headers=headers)
 
 
 @app.websocket("/ws")
@@ -63,4 +126,10 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="localhost", port=8765)
+    # "auto" picks uvloop (libuv event loop) and httptools when installed,
+    # falling back to asyncio/h11 where they aren't available (e.g. Windows)
+    log_listener = configure_logging()
+    try:
+        uvicorn.run(app, host="localhost", port=8765, loop="auto", http="auto")
+    finally:
+        log_listener.stop()
@@ -5,14 +5,17 @@ import asyncio
 import json
 import websockets
 
+try:
+    import uvloop  # Faster event loop where available (not on Windows)
+except ImportError:
+    uvloop = None
+
 async def test_aibot():
     """Connect to chat server and test AIBot"""
-    uri = "ws://localhost:8765/ws"
+    # The server takes the username from the query string at handshake
+    uri = "ws://localhost:8765/ws?username=TestUser"
     
     async with websockets.connect(uri) as websocket:
-        # Send username
-        await websocket.send(json.dumps({"username": "TestUser"}))
-        
         # Receive session info
         session_info = await websocket.recv()
         print(f"Session info: {session_info}")
@@ -25,14 +28,28 @@ async def test_aibot():
         print("\nSending /AIBot python message...")
         await websocket.send(json.dumps({"text": "/AIBot What is Python?"}))
         
-        # Wait for responses
-        for i in range(5):
-            try:
-                response = await asyncio.wait_for(websocket.recv(), timeout=3.0)
+        # Read frames until AIBot answers (one overall deadline, no idle wait afterwards)
+        try:
+            responses = await asyncio.wait_for(_read_until_aibot(websocket), timeout=3.0)
+            for i, response in enumerate(responses):
                 print(f"Response {i+1}: {response}")
-            except asyncio.TimeoutError:
-                print("Timeout waiting for response")
-                break
+        except asyncio.TimeoutError:
+            print("Timeout waiting for response")
+
+
+async def _read_until_aibot(websocket):
+    """Collect incoming frames until one carries an AIBot message"""
+    responses = []
+    while True:
+        response = await websocket.recv()
+        responses.append(response)
+        data = json.loads(response)
+        messages = data.get("payload", []) if data.get("type") == "multi" else [data]
+        if any(msg.get("sender") == "AIBot" for msg in messages):
+            return responses
 
 if __name__ == "__main__":
-    asyncio.run(test_aibot())
+    if uvloop is not None:
+        uvloop.run(test_aibot())
+    else:
+        asyncio.run(test_aibot())
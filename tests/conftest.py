@@ -1,6 +1,7 @@
 """Pytest configuration and shared fixtures for all tests"""
 import pytest
 import asyncio
+import sys
 from unittest.mock import AsyncMock
 
 from database.chat_database import ChatDatabase
@@ -11,6 +12,20 @@ from websocket.connection_manager import ConnectionManager
 
 pytest_plugins = ("pytest_asyncio",)
 
+# Run async tests on uvloop, like the server does, when it is available
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - uvloop is not built for Windows
+    uvloop = None
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_asyncio_loop_factories(config, item):
+    """Create test event loops with uvloop where installed, else stock asyncio"""
+    if uvloop is not None and sys.platform != "win32":
+        return {"uvloop": uvloop.new_event_loop}
+    return {"asyncio": asyncio.new_event_loop}
+
 
 @pytest.fixture
 async def event_queue():
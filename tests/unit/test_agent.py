@@ -1,9 +1,10 @@
 """Unit tests for MockedAIAgent"""
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from ai.agent import MockedAIAgent
+from ai.agent import INTENT_CACHE_MAX_LEN, MockedAIAgent
 from domain.constants import EVENT_TYPE_AI_RESPONSE
+from domain.models import AIRequestEvent
 from events.publisher import EventPublisher
 
 
@@ -87,6 +88,67 @@ class TestMockedAIAgentIntentDetection:
         intent = agent.detect_intent("Python and asyncio together")
         assert intent in ["python", "async"]  # Should match one of these
 
+    def test_detect_intent_order_wins_over_keyword_position(self):
+        """Test that the intent listed first wins when a message hits several intents"""
+        publisher = MagicMock(spec=EventPublisher)
+        agent = MockedAIAgent(publisher)
+        
+        assert agent.detect_intent("How do I use asyncio with a database in python?") == "python"
+        assert agent.detect_intent("tell me about sql and fastapi") == "python"
+        assert agent.detect_intent("SQLite over a WebSocket") == "websocket"
+        assert agent.detect_intent("WebSocket backed by SQLite") == "websocket"
+        assert agent.detect_intent("store events in a queue") == "event"
+
+    def test_scanner_prefers_longest_keyword(self):
+        """Test that the prefix-factored scanner matches the longest keyword at a position"""
+        publisher = MagicMock(spec=EventPublisher)
+        agent = MockedAIAgent(publisher)
+        
+        def keyword(message):
+            match = agent._scanner.search(message)
+            return match.group(match.lastindex)
+        
+        assert keyword("Asynchronous code") == "Asynchronous"
+        assert keyword("asyncio loop") == "asyncio"
+        assert keyword("an event-driven app") == "event-driven"
+        assert keyword("SQLite") == "SQLite"
+        assert keyword("plain sql") == "sql"
+
+    def test_detect_intent_shorter_keyword_of_earlier_intent_wins(self):
+        """Test that a longer keyword of a later intent can't hide an earlier intent"""
+        class Agent(MockedAIAgent):
+            intents = {
+                "first": {"keywords": ["sql"], "response": "first"},
+                "second": {"keywords": ["sqlite"], "response": "second"},
+            }
+        
+        agent = Agent(MagicMock(spec=EventPublisher))
+        
+        assert agent.detect_intent("SQLite") == "first"
+
+    def test_detect_intent_caches_repeated_messages(self):
+        """Test that repeated messages hit the intent cache"""
+        publisher = MagicMock(spec=EventPublisher)
+        agent = MockedAIAgent(publisher)
+        
+        agent.detect_intent("Tell me about Python")
+        agent.detect_intent("Tell me about Python")
+        info = agent._detect_cached.cache_info()
+        
+        assert info.hits == 1
+        assert info.misses == 1
+        agent._detect_cached.cache_clear()
+        assert agent._detect_cached.cache_info().currsize == 0
+
+    def test_detect_intent_skips_cache_for_long_messages(self):
+        """Test that messages over INTENT_CACHE_MAX_LEN are scanned but not cached"""
+        publisher = MagicMock(spec=EventPublisher)
+        agent = MockedAIAgent(publisher)
+        long_message = "python " + "x" * INTENT_CACHE_MAX_LEN
+        
+        assert agent.detect_intent(long_message) == "python"
+        assert agent._detect_cached.cache_info().currsize == 0
+
 
 @pytest.mark.unit
 class TestMockedAIAgentResponses:
@@ -168,7 +230,7 @@ class TestMockedAIAgentProcessRequest:
         publisher = AsyncMock(spec=EventPublisher)
         agent = MockedAIAgent(publisher)
         
-        request_event = {"text": "Tell me about Python"}
+        request_event = AIRequestEvent(text="Tell me about Python")
         await agent.process_request(request_event)
         
         # Verify publisher.publish was called
@@ -179,7 +241,7 @@ class TestMockedAIAgentProcessRequest:
         publisher = AsyncMock(spec=EventPublisher)
         agent = MockedAIAgent(publisher)
         
-        request_event = {"text": "Python programming"}
+        request_event = AIRequestEvent(text="Python programming")
         await agent.process_request(request_event)
         
         # Get the published event
@@ -192,7 +254,7 @@ class TestMockedAIAgentProcessRequest:
         publisher = AsyncMock(spec=EventPublisher)
         agent = MockedAIAgent(publisher)
         
-        request_event = {"text": "How does asyncio work?"}
+        request_event = AIRequestEvent(text="How does asyncio work?")
         await agent.process_request(request_event)
         
         published_event = publisher.publish.call_args[0][0]
@@ -203,7 +265,7 @@ class TestMockedAIAgentProcessRequest:
         publisher = AsyncMock(spec=EventPublisher)
         agent = MockedAIAgent(publisher)
         
-        request_event = {"text": "WebSocket question"}
+        request_event = AIRequestEvent(text="WebSocket question")
         await agent.process_request(request_event)
         
         published_event = publisher.publish.call_args[0][0]
@@ -215,7 +277,7 @@ class TestMockedAIAgentProcessRequest:
         publisher = AsyncMock(spec=EventPublisher)
         agent = MockedAIAgent(publisher)
         
-        request_event = {"text": ""}
+        request_event = AIRequestEvent(text="")
         await agent.process_request(request_event)
         
         # Should still publish event with default intent
@@ -224,11 +286,11 @@ class TestMockedAIAgentProcessRequest:
         assert published_event.detected_intent == "default"
 
     async def test_process_request_handles_missing_text_key(self):
-        """Test processing request with missing 'text' key"""
+        """Test processing request built without a text field"""
         publisher = AsyncMock(spec=EventPublisher)
         agent = MockedAIAgent(publisher)
         
-        request_event = {}
+        request_event = AIRequestEvent()
         await agent.process_request(request_event)
         
         # Should still publish an event
@@ -236,6 +298,54 @@ class TestMockedAIAgentProcessRequest:
         published_event = publisher.publish.call_args[0][0]
         assert published_event.type == EVENT_TYPE_AI_RESPONSE
 
+    async def test_process_request_skips_sleep_without_latency(self):
+        """Test that no artificial delay is added by default"""
+        publisher = AsyncMock(spec=EventPublisher)
+        agent = MockedAIAgent(publisher)
+        
+        with patch("ai.agent.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            await agent.process_request(AIRequestEvent(text="Python"))
+        
+        sleep.assert_not_called()
+
+    async def test_process_request_simulates_latency_when_configured(self):
+        """Test that simulate_latency adds the configured delay"""
+        publisher = AsyncMock(spec=EventPublisher)
+        agent = MockedAIAgent(publisher, simulate_latency=0.25)
+        
+        with patch("ai.agent.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            await agent.process_request(AIRequestEvent(text="Python"))
+        
+        sleep.assert_awaited_once_with(0.25)
+        assert publisher.publish.called
+
+    async def test_process_request_reuses_cached_intent(self):
+        """Test that a repeated question hits the reply cache and keeps the quoted reply"""
+        publisher = AsyncMock(spec=EventPublisher)
+        agent = MockedAIAgent(publisher)
+        
+        await agent.process_request(AIRequestEvent(text="Tell me a joke"))
+        await agent.process_request(AIRequestEvent(text="Tell me a joke"))
+        info = agent._respond_cached.cache_info()
+        
+        assert info.hits == 1
+        assert info.misses == 1
+        first, second = (call.args[0] for call in publisher.publish.call_args_list)
+        assert first.text == second.text
+        assert "Tell me a joke" in second.text
+        assert second.detected_intent == "default"
+
+    async def test_process_request_skips_cache_for_long_messages(self):
+        """Test that long messages get a reply without entering the reply cache"""
+        publisher = AsyncMock(spec=EventPublisher)
+        agent = MockedAIAgent(publisher)
+        long_message = "x" * (INTENT_CACHE_MAX_LEN + 1)
+        
+        await agent.process_request(AIRequestEvent(text=long_message))
+        
+        assert agent._respond_cached.cache_info().currsize == 0
+        assert long_message in publisher.publish.call_args[0][0].text
+
     async def test_process_request_publishes_error_on_exception(self):
         """Test that errors are published as events"""
         publisher = AsyncMock(spec=EventPublisher)
@@ -244,7 +354,7 @@ class TestMockedAIAgentProcessRequest:
         agent = MockedAIAgent(publisher)
         agent.detect_intent = MagicMock(side_effect=Exception("Test error"))
         
-        request_event = {"text": "Trigger error"}
+        request_event = AIRequestEvent(text="Trigger error")
         await agent.process_request(request_event)
         
         # Should publish error event
@@ -0,0 +1,333 @@
+"""Unit tests for ChatDatabase"""
+import asyncio
+import threading
+import pytest
+import orjson
+from unittest.mock import MagicMock
+
+from database.chat_database import ChatDatabase, MAX_BATCH, _SQL_SELECT_HISTORY
+from domain.models import Message
+from domain.constants import MESSAGE_TYPE_USER, MESSAGE_TYPE_AI_RESPONSE, CONVERSATION_DEFAULT
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestChatDatabaseSaveMessage:
+    """Test ChatDatabase batched message writes"""
+
+    async def test_saved_message_appears_in_history(self, in_memory_db):
+        """Test that a saved message is returned by get_conversation_history"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Hello"))
+        history = await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT)
+
+        assert len(history) == 1
+        assert history[0].sender == "Alice"
+        assert history[0].text == "Hello"
+        assert history[0].msg_type == MESSAGE_TYPE_USER
+
+    async def test_flush_writes_pending_messages(self, in_memory_db):
+        """Test that flush() waits until queued messages are committed"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+
+        for i in range(5):
+            await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text=f"Message {i}"))
+        await in_memory_db.flush()
+
+        row = in_memory_db.conn.execute("SELECT COUNT(*) FROM messages").fetchone()
+        assert row[0] == 5
+
+    async def test_flush_does_not_wait_for_rows_queued_later(self, in_memory_db, monkeypatch):
+        """Test that flush() returns once earlier rows are written, even if a later write is stuck"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        release = threading.Event()
+        write_batch = in_memory_db._write_batch
+
+        def slow_write_batch(batch):
+            if any(isinstance(item, Message) and item.text == "Later" for item in batch):
+                release.wait(timeout=5)
+            write_batch(batch)
+
+        monkeypatch.setattr(in_memory_db, "_write_batch", slow_write_batch)
+
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Earlier"))
+        flush_task = asyncio.create_task(in_memory_db.flush())
+        await asyncio.sleep(0)
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Later"))
+        try:
+            await asyncio.wait_for(flush_task, timeout=1)
+            texts = [row[0] for row in in_memory_db.conn.execute("SELECT text FROM messages")]
+        finally:
+            release.set()
+
+        assert texts == ["Earlier"]
+
+    async def test_burst_larger_than_batch_is_fully_written(self, in_memory_db):
+        """Test that bursts larger than MAX_BATCH are split across transactions"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+
+        for i in range(MAX_BATCH * 2 + 1):
+            await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text=f"Message {i}"))
+        history = await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT, limit=MAX_BATCH * 3)
+
+        assert len(history) == MAX_BATCH * 2 + 1
+
+    async def test_messages_keep_insertion_order(self, in_memory_db):
+        """Test that batched messages preserve the order they were saved in"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        ai_id = await in_memory_db.get_or_create_user("AIBot")
+
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Question"))
+        await in_memory_db.save_message(
+            Message(sender_id=ai_id, sender="AIBot", text="Answer", msg_type=MESSAGE_TYPE_AI_RESPONSE)
+        )
+        history = await in_memory_db.get_conversation_history_dict(CONVERSATION_DEFAULT)
+
+        assert [msg["text"] for msg in history] == ["Question", "Answer"]
+        assert history[1]["msg_type"] == MESSAGE_TYPE_AI_RESPONSE
+
+    async def test_history_encodes_like_history_dict(self, in_memory_db):
+        """Test that orjson-encoding history rows gives the same JSON as the dict form"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Hi"))
+
+        history = await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT)
+        history_dict = await in_memory_db.get_conversation_history_dict(CONVERSATION_DEFAULT)
+
+        assert orjson.dumps(history) == orjson.dumps(history_dict)
+
+    async def test_failing_row_does_not_drop_rest_of_batch(self, in_memory_db):
+        """Test that a row violating a foreign key is dropped alone, not with its batch"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Before"))
+        await in_memory_db.save_message(Message(sender_id="no-such-user", sender="Ghost", text="Bad"))
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="After"))
+        history = await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT)
+
+        assert [msg.text for msg in history] == ["Before", "After"]
+
+    async def test_close_flushes_pending_messages(self, tmp_path):
+        """Test that close() writes queued messages before closing"""
+        db_path = str(tmp_path / "chat.db")
+        db = ChatDatabase(db_path)
+        await db.init()
+        user_id = await db.get_or_create_user("Alice")
+        await db.save_message(Message(sender_id=user_id, sender="Alice", text="Persist me"))
+        await db.close()
+
+        reopened = ChatDatabase(db_path)
+        await reopened.init()
+        history = await reopened.get_conversation_history(CONVERSATION_DEFAULT)
+        await reopened.close()
+
+        assert [msg.text for msg in history] == ["Persist me"]
+
+    async def test_close_does_not_hang_when_writer_died(self, in_memory_db):
+        """Test that close() drops queued rows and releases flush() when the writer is gone"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        in_memory_db._writer_task.cancel()
+        await asyncio.sleep(0)
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Lost"))
+        flush_task = asyncio.create_task(in_memory_db.flush())
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(in_memory_db.close(), timeout=1)
+
+        await asyncio.wait_for(flush_task, timeout=1)
+        assert in_memory_db.conn is None
+
+    async def test_close_is_bounded_when_write_is_stuck(self, in_memory_db, monkeypatch):
+        """Test that close() gives up after CLOSE_TIMEOUT while a write blocks its thread"""
+        monkeypatch.setattr("database.chat_database.CLOSE_TIMEOUT", 0.05)
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        release = threading.Event()
+        write_batch = in_memory_db._write_batch
+
+        def stuck_write_batch(batch):
+            release.wait(timeout=5)
+            write_batch(batch)
+
+        monkeypatch.setattr(in_memory_db, "_write_batch", stuck_write_batch)
+
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Stuck"))
+        try:
+            await asyncio.wait_for(in_memory_db.close(), timeout=1)
+        finally:
+            release.set()
+
+        assert in_memory_db.conn is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestChatDatabaseHistoryCache:
+    """Test ChatDatabase conversation history cache"""
+
+    async def test_repeated_history_read_uses_cache(self, in_memory_db):
+        """Test that a second identical read does not query SQLite"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Hello"))
+        first = await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT)
+
+        in_memory_db._fetch_history = MagicMock(side_effect=AssertionError("cache miss"))
+        second = await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT)
+
+        assert second == first
+
+    async def test_new_message_invalidates_cache(self, in_memory_db):
+        """Test that writing to a conversation makes the next read see the new row"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="One"))
+        await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT)
+
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Two"))
+        history = await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT)
+
+        assert [msg.text for msg in history] == ["One", "Two"]
+
+    async def test_history_cache_is_bounded(self, in_memory_db, monkeypatch):
+        """Test that the history cache evicts old entries"""
+        monkeypatch.setattr("database.chat_database.HISTORY_CACHE_SIZE", 2)
+
+        for limit in (10, 20, 30):
+            await in_memory_db.get_conversation_history(CONVERSATION_DEFAULT, limit=limit)
+
+        assert [key[1] for key in in_memory_db._history_cache] == [20, 30]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestChatDatabaseUsers:
+    """Test ChatDatabase user upsert and cache"""
+
+    async def test_get_or_create_user_returns_same_id(self, in_memory_db):
+        """Test that the same username always maps to the same user_id"""
+        first = await in_memory_db.get_or_create_user("Alice")
+        second = await in_memory_db.get_or_create_user("Alice")
+        other = await in_memory_db.get_or_create_user("Bob")
+
+        assert first == second
+        assert first != other
+        assert in_memory_db.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 2
+
+    async def test_existing_user_found_after_cache_clear(self, in_memory_db):
+        """Test that the upsert returns the stored id when the user already exists"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        in_memory_db._user_cache.clear()
+
+        assert await in_memory_db.get_or_create_user("Alice") == user_id
+
+    async def test_user_cache_is_bounded(self, in_memory_db, monkeypatch):
+        """Test that the least recently used username is evicted"""
+        monkeypatch.setattr("database.chat_database.USER_CACHE_SIZE", 2)
+
+        await in_memory_db.get_or_create_user("Alice")
+        await in_memory_db.get_or_create_user("Bob")
+        await in_memory_db.get_or_create_user("Alice")
+        await in_memory_db.get_or_create_user("Carol")
+
+        assert list(in_memory_db._user_cache) == ["Alice", "Carol"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestChatDatabaseParticipants:
+    """Test ChatDatabase conversation participants"""
+
+    async def test_add_user_to_conversation_is_idempotent(self, in_memory_db):
+        """Test that joining the same conversation twice keeps a single row"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+
+        await in_memory_db.add_user_to_conversation(user_id, CONVERSATION_DEFAULT)
+        await in_memory_db.add_user_to_conversation(user_id, CONVERSATION_DEFAULT)
+        await in_memory_db.flush()
+
+        rows = in_memory_db.conn.execute(
+            "SELECT conversation_id, user_id FROM conversation_participants"
+        ).fetchall()
+        assert rows == [(CONVERSATION_DEFAULT, user_id)]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestChatDatabasePragmas:
+    """Test ChatDatabase connection settings"""
+
+    async def test_file_database_uses_wal(self, tmp_path):
+        """Test that on-disk databases run in WAL mode with synchronous=NORMAL"""
+        db = ChatDatabase(str(tmp_path / "chat.db"))
+        await db.init()
+
+        journal_mode = db.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        synchronous = db.conn.execute("PRAGMA synchronous").fetchone()[0]
+        await db.close()
+
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+
+    async def test_foreign_keys_still_enabled(self, in_memory_db):
+        """Test that foreign key enforcement stays on"""
+        assert in_memory_db.conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestChatDatabaseSearch:
+    """Test ChatDatabase full-text search"""
+
+    async def test_search_finds_matching_messages(self, in_memory_db):
+        """Test that search_messages returns only messages containing the term"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="I love Python"))
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Cats are great"))
+
+        results = await in_memory_db.search_messages("python")
+
+        assert [msg.text for msg in results] == ["I love Python"]
+        assert results[0].sender == "Alice"
+
+    async def test_search_ignores_diacritics(self, in_memory_db):
+        """Test that accented text matches unaccented queries"""
+        user_id = await in_memory_db.get_or_create_user("Alice")
+        await in_memory_db.save_message(Message(sender_id=user_id, sender="Alice", text="Un café por favor"))
+
+        results = await in_memory_db.search_messages("cafe")
+
+        assert len(results) == 1
+
+    async def test_search_indexes_existing_messages(self, tmp_path):
+        """Test that messages stored before the FTS table existed are indexed"""
+        db_path = str(tmp_path / "chat.db")
+        db = ChatDatabase(db_path)
+        await db.init()
+        user_id = await db.get_or_create_user("Alice")
+        await db.save_message(Message(sender_id=user_id, sender="Alice", text="Legacy sqlite message"))
+        await db.flush()
+        db.conn.execute("DROP TABLE messages_fts")
+        await db.close()
+
+        reopened = ChatDatabase(db_path)
+        await reopened.init()
+        results = await reopened.search_messages("sqlite")
+        await reopened.close()
+
+        assert [msg.text for msg in results] == ["Legacy sqlite message"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestChatDatabaseIndexes:
+    """Test ChatDatabase query plans"""
+
+    async def test_history_query_uses_covering_index(self, in_memory_db):
+        """Test that history reads are served from the covering index"""
+        plan = in_memory_db.conn.execute(
+            "EXPLAIN QUERY PLAN " + _SQL_SELECT_HISTORY,
+            (CONVERSATION_DEFAULT, 50)
+        ).fetchall()
+
+        details = [row[-1] for row in plan]
+        assert any("COVERING INDEX idx_messages_conv_covering" in detail for detail in details)
+        assert not any("TEMP B-TREE" in detail for detail in details)
@@ -1,7 +1,8 @@
 """Unit tests for WebSocket ConnectionManager"""
 import pytest
+import asyncio
 import json
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 from websocket.connection_manager import ConnectionManager
 
@@ -136,6 +137,20 @@ class TestConnectionManagerDisconnect:
         assert ws2 in manager.active_connections
         assert ws1 not in manager.active_connections
 
+    async def test_disconnect_stops_writer_task(self):
+        """Test that disconnect() cancels the connection's writer task"""
+        manager = ConnectionManager()
+        ws = AsyncMock()
+
+        await manager.connect(ws)
+        writer = manager._clients[ws].writer
+
+        manager.disconnect(ws)
+        await asyncio.sleep(0)
+
+        assert writer.cancelled()
+        assert ws not in manager._clients
+
 
 @pytest.mark.unit
 @pytest.mark.asyncio
@@ -155,6 +170,7 @@ class TestConnectionManagerBroadcast:
         
         message = {"type": "test", "content": "Hello"}
         await manager.broadcast(message)
+        await manager.flush()
         
         ws1.send_text.assert_called_once()
         ws2.send_text.assert_called_once()
@@ -169,6 +185,7 @@ class TestConnectionManagerBroadcast:
         
         message = {"type": "test", "value": 42}
         await manager.broadcast(message)
+        await manager.flush()
         
         # Check that send_text was called with JSON string
         ws.send_text.assert_called_once()
@@ -186,6 +203,7 @@ class TestConnectionManagerBroadcast:
         
         # Should not raise an error
         await manager.broadcast(message)
+        await manager.flush()
 
     async def test_broadcast_removes_disconnected_connections(self):
         """Test that broadcast removes disconnected clients"""
@@ -201,6 +219,7 @@ class TestConnectionManagerBroadcast:
         
         message = {"type": "test"}
         await manager.broadcast(message)
+        await manager.flush()
         
         # ws1 should be removed from active connections
         assert manager.get_connection_count() == 1
@@ -223,6 +242,7 @@ class TestConnectionManagerBroadcast:
         
         message = {"type": "test"}
         await manager.broadcast(message)
+        await manager.flush()
         
         # ws1 and ws3 should still have been sent the message
         ws1.send_text.assert_called_once()
@@ -242,6 +262,7 @@ class TestConnectionManagerBroadcast:
         
         message = {"sender": "user1", "text": "Hello all", "type": "message"}
         await manager.broadcast(message)
+        await manager.flush()
         
         sent_text = ws.send_text.call_args[0][0]
         decoded = json.loads(sent_text)
@@ -269,6 +290,7 @@ class TestConnectionManagerBroadcastExcept:
         
         message = {"type": "test"}
         await manager.broadcast_except(message, ws2)
+        await manager.flush()
         
         # ws1 and ws3 should receive message, ws2 should not
         ws1.send_text.assert_called_once()
@@ -286,11 +308,95 @@ class TestConnectionManagerBroadcastExcept:
         
         message = {"type": "notification", "count": 5}
         await manager.broadcast_except(message, ws1)
+        await manager.flush()
         
         sent_text = ws2.send_text.call_args[0][0]
         decoded = json.loads(sent_text)
         assert decoded == message
 
+    async def test_broadcast_does_not_wait_for_slow_client(self):
+        """Test that broadcast only queues, so a stuck client doesn't block it or others"""
+        manager = ConnectionManager()
+        slow_ws = AsyncMock()
+        fast_ws = AsyncMock()
+        release = asyncio.Event()
+        
+        async def slow_send(text):
+            await release.wait()
+        
+        slow_ws.send_text.side_effect = slow_send
+        await manager.connect(slow_ws)
+        await manager.connect(fast_ws)
+        
+        await manager.broadcast({"text": "one"})
+        await manager.broadcast({"text": "two"})
+        await asyncio.sleep(0)
+        
+        assert fast_ws.send_text.call_count == 2
+        assert slow_ws.send_text.call_count == 1
+        release.set()
+        await manager.flush()
+        assert slow_ws.send_text.call_count == 2
+
+    async def test_broadcast_preserves_order_per_client(self):
+        """Test that each client receives frames in broadcast order"""
+        manager = ConnectionManager()
+        ws = AsyncMock()
+        await manager.connect(ws)
+        
+        for i in range(5):
+            await manager.broadcast_text(str(i))
+        await manager.flush()
+        
+        assert [c.args[0] for c in ws.send_text.call_args_list] == ["0", "1", "2", "3", "4"]
+
+    async def test_full_outbox_closes_slow_client(self, monkeypatch):
+        """Test that a client whose outbox overflows is dropped and closed"""
+        monkeypatch.setattr("websocket.connection_manager.OUTBOX_SIZE", 2)
+        manager = ConnectionManager()
+        stuck_ws = AsyncMock()
+        ok_ws = AsyncMock()
+        never = asyncio.Event()
+        
+        async def stuck_send(text):
+            await never.wait()
+        
+        stuck_ws.send_text.side_effect = stuck_send
+        await manager.connect(stuck_ws)
+        await manager.connect(ok_ws)
+        await asyncio.sleep(0)
+        
+        # First frame is taken by the writer, two fill the outbox, the fourth overflows
+        for i in range(4):
+            await manager.broadcast_text(str(i))
+            await asyncio.sleep(0)
+        await manager.flush()
+        await asyncio.sleep(0)
+        
+        assert stuck_ws not in manager.active_connections
+        stuck_ws.close.assert_awaited_once_with(code=1013)
+        assert ok_ws in manager.active_connections
+        assert ok_ws.send_text.call_count == 4
+
+    async def test_broadcast_text_sends_same_payload_to_all(self):
+        """Test that broadcast_text hands the pre-serialized string to every client"""
+        manager = ConnectionManager()
+        ws1 = AsyncMock()
+        ws2 = AsyncMock()
+        ws3 = AsyncMock()
+        
+        await manager.connect(ws1)
+        await manager.connect(ws2)
+        await manager.connect(ws3)
+        
+        payload = '{"sender":"user1","text":"Hi"}'
+        await manager.broadcast_text(payload, exclude=ws2)
+        await manager.flush()
+        
+        assert ws1.send_text.call_args[0][0] is payload
+        assert ws3.send_text.call_args[0][0] is payload
+        ws2.send_text.assert_not_called()
+
     async def test_broadcast_except_with_single_connection(self):
         """Test broadcast_except when excluding the only connection"""
         manager = ConnectionManager()
@@ -300,10 +406,24 @@ class TestConnectionManagerBroadcastExcept:
         
         message = {"type": "test"}
         await manager.broadcast_except(message, ws)
+        await manager.flush()
         
         # Message should not be sent since we're excluding the only client
         ws.send_text.assert_not_called()
 
+    async def test_broadcast_skips_serialization_without_recipients(self):
+        """Test that nothing is encoded when no client would receive the message"""
+        manager = ConnectionManager()
+        sender = AsyncMock()
+        
+        with patch("websocket.connection_manager.orjson") as orjson_mock:
+            await manager.broadcast({"type": "test"})
+            await manager.connect(sender)
+            await manager.broadcast_except({"type": "test"}, sender)
+        
+        orjson_mock.dumps.assert_not_called()
+        sender.send_text.assert_not_called()
+
     async def test_broadcast_except_removes_disconnected(self):
         """Test that broadcast_except removes disconnected clients"""
         manager = ConnectionManager()
@@ -320,6 +440,7 @@ class TestConnectionManagerBroadcastExcept:
         
         message = {"type": "test"}
         await manager.broadcast_except(message, ws1)
+        await manager.flush()
         
         # ws1 is excluded, ws2 fails and is removed, ws3 receives message
         ws1.send_text.assert_not_called()
@@ -347,6 +468,7 @@ class TestConnectionManagerBroadcastExcept:
         
         message = {"type": "test"}
         await manager.broadcast_except(message, ws2)
+        await manager.flush()
         
         # ws3 should still receive message despite ws1 error
         ws3.send_text.assert_called_once()
@@ -366,11 +488,61 @@ class TestConnectionManagerBroadcastExcept:
         message = {"type": "test"}
         # Exclude a connection that doesn't exist - should still broadcast to all
         await manager.broadcast_except(message, exclude_ws)
+        await manager.flush()
         
         ws1.send_text.assert_called_once()
         ws2.send_text.assert_called_once()
 
 
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestConnectionManagerSendText:
+    """Test ConnectionManager direct frames and held connections"""
+
+    async def test_send_text_goes_through_outbox_in_order(self):
+        """Test that send_text frames are sent by the writer, in order with broadcasts"""
+        manager = ConnectionManager()
+        ws = AsyncMock()
+        other_ws = AsyncMock()
+        await manager.connect(ws)
+        await manager.connect(other_ws)
+        
+        await manager.broadcast_text("1")
+        await manager.send_text(ws, "2")
+        await manager.broadcast_text("3")
+        await manager.flush()
+        
+        assert [c.args[0] for c in ws.send_text.call_args_list] == ["1", "2", "3"]
+        assert [c.args[0] for c in other_ws.send_text.call_args_list] == ["1", "3"]
+
+    async def test_send_text_to_unknown_connection_is_ignored(self):
+        """Test that send_text to a socket that is not connected does nothing"""
+        manager = ConnectionManager()
+        ws = AsyncMock()
+        
+        await manager.send_text(ws, "hello")
+        
+        ws.send_text.assert_not_called()
+
+    async def test_held_connection_gets_direct_frames_first(self):
+        """Test that broadcasts to a held connection wait until release()"""
+        manager = ConnectionManager()
+        ws = AsyncMock()
+        await manager.connect(ws, hold=True)
+        
+        await manager.broadcast_text("broadcast")
+        await manager.send_text(ws, "connected")
+        await manager.send_text(ws, "history")
+        await manager.flush()
+        assert [c.args[0] for c in ws.send_text.call_args_list] == ["connected", "history"]
+        
+        manager.release(ws)
+        await manager.broadcast_text("after")
+        await manager.flush()
+        
+        assert [c.args[0] for c in ws.send_text.call_args_list] == ["connected", "history", "broadcast", "after"]
+
+
 @pytest.mark.unit
 class TestConnectionManagerState:
     """Test ConnectionManager state management"""
@@ -4,7 +4,11 @@ import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
 from events.consumer import EventConsumer, AIEventConsumer
-from domain.models import Message
+from events.publisher import EventPublisher
+from ai.agent import MockedAIAgent
+from database.chat_database import ChatDatabase
+from websocket.connection_manager import ConnectionManager
+from domain.models import Message, UserMessageEvent, AIRequestEvent, AIResponseEvent
 from domain.constants import (
     EVENT_TYPE_USER_MESSAGE,
     EVENT_TYPE_AI_REQUEST,
@@ -21,9 +25,9 @@ class TestEventConsumerInitialization:
     def test_consumer_initialization(self):
         """Test creating EventConsumer instance"""
         queue = asyncio.Queue()
-        db = MagicMock()
-        ai_agent = MagicMock()
-        connection_manager = MagicMock()
+        db = MagicMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = MagicMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
@@ -41,65 +45,82 @@ class TestEventConsumerHandleEvent:
     async def test_handle_user_message_event_routed(self):
         """Test that USER_MESSAGE events are routed to handle_user_message"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         consumer.handle_user_message = AsyncMock()
         consumer.handle_ai_response = AsyncMock()
         
-        event = {
-            "type": EVENT_TYPE_USER_MESSAGE,
-            "user_id": "user_1",
-            "sender": "User",
-            "text": "Hello",
-        }
+        event = UserMessageEvent(
+            type=EVENT_TYPE_USER_MESSAGE,
+            user_id="user_1",
+            sender="User",
+            text="Hello",
+        )
         
         await consumer.handle_event(event)
         
-        consumer.handle_user_message.assert_called_once_with(event)
+        consumer.handle_user_message.assert_called_once()
+        assert consumer.handle_user_message.call_args.args[0] is event
         consumer.handle_ai_response.assert_not_called()
 
     async def test_handle_ai_response_event_routed(self):
         """Test that AI_RESPONSE events are routed to handle_ai_response"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         consumer.handle_user_message = AsyncMock()
         consumer.handle_ai_response = AsyncMock()
         
-        event = {
-            "type": EVENT_TYPE_AI_RESPONSE,
-            "text": "AI response",
-        }
+        event = AIResponseEvent(
+            type=EVENT_TYPE_AI_RESPONSE,
+            text="AI response",
+        )
         
         await consumer.handle_event(event)
         
-        consumer.handle_ai_response.assert_called_once_with(event)
+        consumer.handle_ai_response.assert_called_once()
+        assert consumer.handle_ai_response.call_args.args[0] is event
         consumer.handle_user_message.assert_not_called()
 
     async def test_handle_event_with_unknown_type(self):
-        """Test that unknown event types are ignored"""
+        """Test that objects that are not known event classes are ignored"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         consumer.handle_user_message = AsyncMock()
         consumer.handle_ai_response = AsyncMock()
         
-        event = {"type": "unknown_type"}
+        event = object()
         
         await consumer.handle_event(event)
         
         consumer.handle_user_message.assert_not_called()
         consumer.handle_ai_response.assert_not_called()
 
+    async def test_event_consumer_ignores_ai_request(self):
+        """Test that the base EventConsumer has no handler for AI requests"""
+        queue = asyncio.Queue()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = AsyncMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
+        
+        consumer = EventConsumer(queue, db, ai_agent, connection_manager)
+        consumer.handle_user_message = AsyncMock()
+        
+        await consumer.handle_event(AIRequestEvent(text="Process this"))
+        
+        consumer.handle_user_message.assert_not_called()
+        ai_agent.process_request.assert_not_called()
+
 
 @pytest.mark.unit
 @pytest.mark.asyncio
@@ -109,18 +130,18 @@ class TestEventConsumerHandleUserMessage:
     async def test_handle_user_message_saves_to_db(self):
         """Test that user messages are saved to database"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
-        event = {
-            "type": EVENT_TYPE_USER_MESSAGE,
-            "user_id": "user_1",
-            "sender": "Test User",
-            "text": "Hello world",
-        }
+        event = UserMessageEvent(
+            type=EVENT_TYPE_USER_MESSAGE,
+            user_id="user_1",
+            sender="Test User",
+            text="Hello world",
+        )
         
         await consumer.handle_user_message(event)
         
@@ -135,18 +156,18 @@ class TestEventConsumerHandleUserMessage:
     async def test_handle_user_message_broadcasts(self):
         """Test that user messages are broadcast to clients"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
-        event = {
-            "type": EVENT_TYPE_USER_MESSAGE,
-            "user_id": "user_1",
-            "sender": "Test User",
-            "text": "Message",
-        }
+        event = UserMessageEvent(
+            type=EVENT_TYPE_USER_MESSAGE,
+            user_id="user_1",
+            sender="Test User",
+            text="Message",
+        )
         
         await consumer.handle_user_message(event)
         
@@ -158,20 +179,20 @@ class TestEventConsumerHandleUserMessage:
     async def test_handle_user_message_with_sender_ws(self):
         """Test that user messages exclude sender WebSocket"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
         sender_ws = MagicMock()
-        event = {
-            "type": EVENT_TYPE_USER_MESSAGE,
-            "user_id": "user_1",
-            "sender": "User",
-            "text": "Message",
-            "sender_ws": sender_ws,
-        }
+        event = UserMessageEvent(
+            type=EVENT_TYPE_USER_MESSAGE,
+            user_id="user_1",
+            sender="User",
+            text="Message",
+            sender_ws=sender_ws,
+        )
         
         await consumer.handle_user_message(event)
         
@@ -183,18 +204,18 @@ class TestEventConsumerHandleUserMessage:
     async def test_handle_user_message_skip_if_no_user_id(self):
         """Test that message is skipped if user_id is missing"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
-        event = {
-            "type": EVENT_TYPE_USER_MESSAGE,
-            "user_id": "",
-            "sender": "User",
-            "text": "Message",
-        }
+        event = UserMessageEvent(
+            type=EVENT_TYPE_USER_MESSAGE,
+            user_id="",
+            sender="User",
+            text="Message",
+        )
         
         await consumer.handle_user_message(event)
         
@@ -203,18 +224,18 @@ class TestEventConsumerHandleUserMessage:
     async def test_handle_user_message_skip_if_no_sender(self):
         """Test that message is skipped if sender is missing"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
-        event = {
-            "type": EVENT_TYPE_USER_MESSAGE,
-            "user_id": "user_1",
-            "sender": "",
-            "text": "Message",
-        }
+        event = UserMessageEvent(
+            type=EVENT_TYPE_USER_MESSAGE,
+            user_id="user_1",
+            sender="",
+            text="Message",
+        )
         
         await consumer.handle_user_message(event)
         
@@ -229,17 +250,17 @@ class TestEventConsumerHandleAIResponse:
     async def test_handle_ai_response_saves_to_db(self):
         """Test that AI responses are saved to database"""
         queue = asyncio.Queue()
-        db = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
         db.get_or_create_user = AsyncMock(return_value="ai_user_id")
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
-        event = {
-            "type": EVENT_TYPE_AI_RESPONSE,
-            "text": "AI response text",
-        }
+        event = AIResponseEvent(
+            type=EVENT_TYPE_AI_RESPONSE,
+            text="AI response text",
+        )
         
         await consumer.handle_ai_response(event)
         
@@ -250,20 +271,36 @@ class TestEventConsumerHandleAIResponse:
         assert saved_message.text == "AI response text"
         assert saved_message.msg_type == MESSAGE_TYPE_AI_RESPONSE
 
+    async def test_handle_ai_response_uses_known_ai_user_id(self):
+        """Test that a preset AIBot user_id skips the database lookup"""
+        queue = asyncio.Queue()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
+        
+        consumer = EventConsumer(queue, db, ai_agent, connection_manager, ai_user_id="ai_user_id")
+        
+        await consumer.handle_ai_response(AIResponseEvent(text="First"))
+        await consumer.handle_ai_response(AIResponseEvent(text="Second"))
+        
+        db.get_or_create_user.assert_not_called()
+        saved = [call.args[0] for call in db.save_message.call_args_list]
+        assert [m.sender_id for m in saved] == ["ai_user_id", "ai_user_id"]
+
     async def test_handle_ai_response_broadcasts(self):
         """Test that AI responses are broadcast to all clients"""
         queue = asyncio.Queue()
-        db = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
         db.get_or_create_user = AsyncMock(return_value="ai_user_id")
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
-        event = {
-            "type": EVENT_TYPE_AI_RESPONSE,
-            "text": "AI response",
-        }
+        event = AIResponseEvent(
+            type=EVENT_TYPE_AI_RESPONSE,
+            text="AI response",
+        )
         
         await consumer.handle_ai_response(event)
         
@@ -275,17 +312,17 @@ class TestEventConsumerHandleAIResponse:
     async def test_handle_ai_response_handles_save_error(self):
         """Test that save errors are handled gracefully"""
         queue = asyncio.Queue()
-        db = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
         db.get_or_create_user = AsyncMock(side_effect=Exception("DB error"))
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         
-        event = {
-            "type": EVENT_TYPE_AI_RESPONSE,
-            "text": "Response",
-        }
+        event = AIResponseEvent(
+            type=EVENT_TYPE_AI_RESPONSE,
+            text="Response",
+        )
         
         # Should not raise an exception
         await consumer.handle_ai_response(event)
@@ -302,67 +339,71 @@ class TestAIEventConsumerHandleEvent:
     async def test_ai_event_consumer_handles_ai_request(self):
         """Test that AIEventConsumer handles AI_REQUEST events"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = AsyncMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = AsyncMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = AIEventConsumer(queue, db, ai_agent, connection_manager)
         consumer.handle_user_message = AsyncMock()
         
-        event = {
-            "type": EVENT_TYPE_AI_REQUEST,
-            "user_id": "user_1",
-            "sender": "User",
-            "text": "Process this",
-        }
+        event = AIRequestEvent(
+            type=EVENT_TYPE_AI_REQUEST,
+            user_id="user_1",
+            sender="User",
+            text="Process this",
+        )
         
         await consumer.handle_event(event)
         
         # Should handle user message first
-        consumer.handle_user_message.assert_called_once_with(event)
+        consumer.handle_user_message.assert_called_once()
+        assert consumer.handle_user_message.call_args.args[0] is event
         # Then call AI agent
-        ai_agent.process_request.assert_called_once_with(event)
+        ai_agent.process_request.assert_called_once()
+        assert ai_agent.process_request.call_args.args[0] is event
 
     async def test_ai_event_consumer_handles_user_message(self):
         """Test that AIEventConsumer handles USER_MESSAGE events"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = AIEventConsumer(queue, db, ai_agent, connection_manager)
         consumer.handle_user_message = AsyncMock()
         
-        event = {
-            "type": EVENT_TYPE_USER_MESSAGE,
-            "user_id": "user_1",
-            "sender": "User",
-            "text": "Hello",
-        }
+        event = UserMessageEvent(
+            type=EVENT_TYPE_USER_MESSAGE,
+            user_id="user_1",
+            sender="User",
+            text="Hello",
+        )
         
         await consumer.handle_event(event)
         
-        consumer.handle_user_message.assert_called_once_with(event)
+        consumer.handle_user_message.assert_called_once()
+        assert consumer.handle_user_message.call_args.args[0] is event
 
     async def test_ai_event_consumer_handles_ai_response(self):
         """Test that AIEventConsumer handles AI_RESPONSE events"""
         queue = asyncio.Queue()
-        db = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
         db.get_or_create_user = AsyncMock(return_value="ai_id")
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = AIEventConsumer(queue, db, ai_agent, connection_manager)
         consumer.handle_ai_response = AsyncMock()
         
-        event = {
-            "type": EVENT_TYPE_AI_RESPONSE,
-            "text": "Response",
-        }
+        event = AIResponseEvent(
+            type=EVENT_TYPE_AI_RESPONSE,
+            text="Response",
+        )
         
         await consumer.handle_event(event)
         
-        consumer.handle_ai_response.assert_called_once_with(event)
+        consumer.handle_ai_response.assert_called_once()
+        assert consumer.handle_ai_response.call_args.args[0] is event
 
 
 @pytest.mark.unit
@@ -373,20 +414,21 @@ class TestEventConsumerConsume:
     async def test_consume_gets_from_queue(self):
         """Test that consume gets events from queue"""
         queue = asyncio.Queue()
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
-        consumer.handle_event = AsyncMock()
+        handled = asyncio.Event()
+        consumer.handle_event = AsyncMock(side_effect=lambda event: handled.set())
         
         # Add one event then make it stop
-        event = {"type": EVENT_TYPE_USER_MESSAGE}
+        event = UserMessageEvent(type=EVENT_TYPE_USER_MESSAGE)
         queue.put_nowait(event)
         
-        # Run consume for just one iteration
+        # Run consume until the event has been handled
         consume_task = asyncio.create_task(consumer.consume())
-        await asyncio.sleep(0.1)  # Let it process
+        await asyncio.wait_for(handled.wait(), timeout=1)
         consume_task.cancel()
         
         try:
@@ -396,24 +438,137 @@ class TestEventConsumerConsume:
         
         consumer.handle_event.assert_called_once_with(event)
 
+    async def test_consume_drains_backlog_in_order(self):
+        """Test that consume handles a backed-up queue in publish order"""
+        queue = asyncio.Queue()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
+        
+        consumer = EventConsumer(queue, db, ai_agent, connection_manager)
+        
+        for i in range(100):
+            queue.put_nowait(UserMessageEvent(user_id="user_1", sender="User", text=f"Message {i}"))
+        
+        consume_task = asyncio.create_task(consumer.consume())
+        await asyncio.wait_for(queue.join(), timeout=1)
+        consume_task.cancel()
+        
+        try:
+            await consume_task
+        except asyncio.CancelledError:
+            pass
+        
+        saved = [call.args[0].text for call in db.save_message.call_args_list]
+        sent = [msg["text"] for call in connection_manager.broadcast.call_args_list for msg in call.args[0]["payload"]]
+        assert saved == [f"Message {i}" for i in range(100)]
+        assert sent == [f"Message {i}" for i in range(100)]
+
+    async def test_consume_coalesces_consecutive_user_messages(self):
+        """Test that back-to-back messages from one sender go out as one multi frame"""
+        queue = asyncio.Queue()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
+        ws_a = MagicMock()
+        ws_b = MagicMock()
+        
+        consumer = EventConsumer(queue, db, ai_agent, connection_manager, ai_user_id="ai_id")
+        
+        queue.put_nowait(UserMessageEvent(sender_ws=ws_a, user_id="a", sender="A", text="1"))
+        queue.put_nowait(UserMessageEvent(sender_ws=ws_a, user_id="a", sender="A", text="2"))
+        queue.put_nowait(UserMessageEvent(sender_ws=ws_b, user_id="b", sender="B", text="3"))
+        queue.put_nowait(AIResponseEvent(text="4"))
+        
+        consume_task = asyncio.create_task(consumer.consume())
+        await asyncio.wait_for(queue.join(), timeout=1)
+        consume_task.cancel()
+        
+        try:
+            await consume_task
+        except asyncio.CancelledError:
+            pass
+        
+        calls = connection_manager.broadcast_except.call_args_list
+        assert calls[0].args == ({"type": "multi", "payload": [{"sender": "A", "text": "1"}, {"sender": "A", "text": "2"}]}, ws_a)
+        # A single message keeps the plain frame format
+        assert calls[1].args == ({"sender": "B", "text": "3"}, ws_b)
+        connection_manager.broadcast.assert_called_once_with({"sender": "AIBot", "text": "4"})
+        assert db.save_message.call_count == 4
+
+    async def test_ai_request_does_not_deadlock_on_full_queue(self):
+        """Test that an AI reply published onto a full bounded queue doesn't stall the consumer"""
+        queue = asyncio.Queue(maxsize=1)
+        db = AsyncMock(spec=ChatDatabase)
+        db.get_or_create_user = AsyncMock(return_value="ai_id")
+        connection_manager = AsyncMock(spec=ConnectionManager)
+        # Latency lets the user message fill the queue before the reply is published
+        ai_agent = MockedAIAgent(EventPublisher(queue), simulate_latency=0.01)
+        
+        consumer = AIEventConsumer(queue, db, ai_agent, connection_manager)
+        consume_task = asyncio.create_task(consumer.consume())
+        
+        await queue.put(AIRequestEvent(user_id="user_1", sender="User", text="python?"))
+        await queue.put(UserMessageEvent(user_id="user_1", sender="User", text="hello"))
+        await asyncio.wait_for(queue.join(), timeout=1)
+        await asyncio.wait_for(asyncio.gather(*consumer._ai_tasks), timeout=1)
+        await asyncio.wait_for(queue.join(), timeout=1)
+        consume_task.cancel()
+        
+        try:
+            await consume_task
+        except asyncio.CancelledError:
+            pass
+        
+        senders = [call.args[0]["sender"] for call in connection_manager.broadcast.call_args_list]
+        assert "AIBot" in senders
+
+    async def test_drain_waits_for_pending_ai_replies(self):
+        """Test that drain() returns only after in-flight AI replies are handled"""
+        queue = asyncio.Queue()
+        db = AsyncMock(spec=ChatDatabase)
+        connection_manager = AsyncMock(spec=ConnectionManager)
+        ai_agent = MockedAIAgent(EventPublisher(queue), simulate_latency=0.01)
+        
+        consumer = AIEventConsumer(queue, db, ai_agent, connection_manager, ai_user_id="ai_id")
+        consume_task = asyncio.create_task(consumer.consume())
+        
+        await queue.put(AIRequestEvent(user_id="user_1", sender="User", text="python?"))
+        await asyncio.wait_for(consumer.drain(), timeout=1)
+        consume_task.cancel()
+        
+        try:
+            await consume_task
+        except asyncio.CancelledError:
+            pass
+        
+        assert queue.empty()
+        senders = [call.args[0]["sender"] for call in connection_manager.broadcast.call_args_list]
+        assert senders == ["User", "AIBot"]
+
     async def test_consume_calls_task_done(self):
-        """Test that consume calls queue.task_done()"""
-        queue = AsyncMock(spec=asyncio.Queue)
-        queue.get = AsyncMock(side_effect=asyncio.CancelledError())
-        db = AsyncMock()
-        ai_agent = MagicMock()
-        connection_manager = AsyncMock()
+        """Test that consume calls queue.task_done() so queue.join() returns"""
+        queue = asyncio.Queue()
+        db = AsyncMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = AsyncMock(spec=ConnectionManager)
         
         consumer = EventConsumer(queue, db, ai_agent, connection_manager)
         consumer.handle_event = AsyncMock()
+        queue.put_nowait(UserMessageEvent(type=EVENT_TYPE_USER_MESSAGE))
+        queue.put_nowait(AIResponseEvent(type=EVENT_TYPE_AI_RESPONSE))
         
         consume_task = asyncio.create_task(consumer.consume())
-        await asyncio.sleep(0.1)
+        # join() only completes once task_done() was called for both events
+        await asyncio.wait_for(queue.join(), timeout=1)
+        consume_task.cancel()
         
         try:
             await consume_task
         except asyncio.CancelledError:
             pass
+        
+        assert consumer.handle_event.call_count == 2
 
 
 @pytest.mark.unit
@@ -423,9 +578,9 @@ class TestEventConsumerInheritance:
     def test_ai_event_consumer_inherits_from_event_consumer(self):
         """Test that AIEventConsumer inherits from EventConsumer"""
         queue = asyncio.Queue()
-        db = MagicMock()
-        ai_agent = MagicMock()
-        connection_manager = MagicMock()
+        db = MagicMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = MagicMock(spec=ConnectionManager)
         
         consumer = AIEventConsumer(queue, db, ai_agent, connection_manager)
         
@@ -437,9 +592,9 @@ class TestEventConsumerInheritance:
     def test_ai_event_consumer_has_all_attributes(self):
         """Test that AIEventConsumer has all required attributes"""
         queue = asyncio.Queue()
-        db = MagicMock()
-        ai_agent = MagicMock()
-        connection_manager = MagicMock()
+        db = MagicMock(spec=ChatDatabase)
+        ai_agent = MagicMock(spec=MockedAIAgent)
+        connection_manager = MagicMock(spec=ConnectionManager)
         
         consumer = AIEventConsumer(queue, db, ai_agent, connection_manager)
         
@@ -1,5 +1,6 @@
 """Unit tests for domain models"""
 import pytest
+from dataclasses import FrozenInstanceError
 
 from domain.models import (
     User,
@@ -7,6 +8,7 @@ from domain.models import (
     HistoryMessage,
     UserMessageEvent,
     AIRequestEvent,
+    AIResponseEvent,
 )
 from domain.constants import (
     MESSAGE_TYPE_USER,
@@ -126,6 +128,17 @@ class TestHistoryMessage:
         assert hasattr(hist_msg, "msg_type")
         assert hasattr(hist_msg, "timestamp")
 
+    def test_history_message_is_read_only(self):
+        """Test that HistoryMessage rows can't be changed, since cached history shares them"""
+        hist_msg = HistoryMessage(
+            sender="User",
+            text="test",
+            msg_type=MESSAGE_TYPE_USER,
+            timestamp="2024-01-01T12:00:00",
+        )
+        with pytest.raises(FrozenInstanceError):
+            hist_msg.text = "changed"
+
 
 @pytest.mark.unit
 class TestUserMessageEvent:
@@ -181,6 +194,28 @@ class TestAIRequestEvent:
         assert event.sender_ws is None
 
 
+@pytest.mark.unit
+class TestEventSlots:
+    """Test that model and event dataclasses use __slots__"""
+
+    def test_events_have_no_instance_dict(self):
+        """Test that events are slotted and reject unknown attributes"""
+        for event in (UserMessageEvent(), AIRequestEvent(), AIResponseEvent()):
+            assert not hasattr(event, "__dict__")
+            with pytest.raises(AttributeError):
+                event.unknown_field = "value"
+
+    def test_models_have_no_instance_dict(self):
+        """Test that per-message models are slotted too"""
+        models = (
+            User(user_id="user_1", username="Alice"),
+            Message(sender_id="user_1", sender="Alice", text="Hi"),
+            HistoryMessage(sender="Alice", text="Hi", msg_type=MESSAGE_TYPE_USER, timestamp="2024-01-01 00:00:00"),
+        )
+        for model in models:
+            assert not hasattr(model, "__dict__")
+
+
 @pytest.mark.unit
 class TestMessageTypeConstants:
     """Test MessageType constant values"""
@@ -54,13 +54,13 @@ class TestEventPublisherPublishUserMessageEvent:
         assert not queue.empty()
         published = await queue.get()
         
-        assert published["type"] == EVENT_TYPE_USER_MESSAGE
-        assert published["user_id"] == "user_1"
-        assert published["sender"] == "Test User"
-        assert published["text"] == "Hello"
+        assert published.type == EVENT_TYPE_USER_MESSAGE
+        assert published.user_id == "user_1"
+        assert published.sender == "Test User"
+        assert published.text == "Hello"
 
-    async def test_publish_user_message_converts_to_dict(self):
-        """Test that UserMessageEvent is converted to dict"""
+    async def test_publish_user_message_passes_event_through(self):
+        """Test that UserMessageEvent is queued as-is (no dict conversion)"""
         queue = asyncio.Queue()
         publisher = EventPublisher(queue)
         
@@ -74,8 +74,7 @@ class TestEventPublisherPublishUserMessageEvent:
         await publisher.publish(event)
         published = await queue.get()
         
-        assert isinstance(published, dict)
-        assert set(published.keys()) == {"type", "user_id", "sender", "text", "sender_ws"}
+        assert published is event
 
     async def test_publish_user_message_includes_sender_ws(self):
         """Test that sender_ws is included in published event"""
@@ -94,7 +93,7 @@ class TestEventPublisherPublishUserMessageEvent:
         await publisher.publish(event)
         published = await queue.get()
         
-        assert published["sender_ws"] is ws
+        assert published.sender_ws is ws
 
 
 @pytest.mark.unit
@@ -117,13 +116,13 @@ class TestEventPublisherPublishAIRequestEvent:
         await publisher.publish(event)
         
         published = await queue.get()
-        assert published["type"] == EVENT_TYPE_AI_REQUEST
-        assert published["user_id"] == "user_1"
-        assert published["sender"] == "Test User"
-        assert published["text"] == "Process this"
+        assert published.type == EVENT_TYPE_AI_REQUEST
+        assert published.user_id == "user_1"
+        assert published.sender == "Test User"
+        assert published.text == "Process this"
 
-    async def test_publish_ai_request_converts_to_dict(self):
-        """Test that AIRequestEvent is converted to dict"""
+    async def test_publish_ai_request_passes_event_through(self):
+        """Test that AIRequestEvent is queued as-is (no dict conversion)"""
         queue = asyncio.Queue()
         publisher = EventPublisher(queue)
         
@@ -137,8 +136,8 @@ class TestEventPublisherPublishAIRequestEvent:
         await publisher.publish(event)
         published = await queue.get()
         
-        assert isinstance(published, dict)
-        assert published["type"] == EVENT_TYPE_AI_REQUEST
+        assert published is event
+        assert published.type == EVENT_TYPE_AI_REQUEST
 
     async def test_publish_ai_request_preserves_all_fields(self):
         """Test that all AIRequestEvent fields are preserved"""
@@ -157,10 +156,10 @@ class TestEventPublisherPublishAIRequestEvent:
         await publisher.publish(event)
         published = await queue.get()
         
-        assert published["user_id"] == "user_123"
-        assert published["sender"] == "Alice"
-        assert published["text"] == "Request text"
-        assert published["sender_ws"] is ws
+        assert published.user_id == "user_123"
+        assert published.sender == "Alice"
+        assert published.text == "Request text"
+        assert published.sender_ws is ws
 
 
 @pytest.mark.unit
@@ -183,13 +182,13 @@ class TestEventPublisherPublishAIResponseEvent:
         await publisher.publish(event)
         
         published = await queue.get()
-        assert published["type"] == EVENT_TYPE_AI_RESPONSE
-        assert published["text"] == "AI response"
-        assert published["original_message"] == "User message"
-        assert published["detected_intent"] == "python"
+        assert published.type == EVENT_TYPE_AI_RESPONSE
+        assert published.text == "AI response"
+        assert published.original_message == "User message"
+        assert published.detected_intent == "python"
 
-    async def test_publish_ai_response_converts_to_dict(self):
-        """Test that AIResponseEvent is converted to dict"""
+    async def test_publish_ai_response_passes_event_through(self):
+        """Test that AIResponseEvent is queued as-is (no dict conversion)"""
         queue = asyncio.Queue()
         publisher = EventPublisher(queue)
         
@@ -203,10 +202,10 @@ class TestEventPublisherPublishAIResponseEvent:
         await publisher.publish(event)
         published = await queue.get()
         
-        assert isinstance(published, dict)
+        assert published is event
 
     async def test_publish_ai_response_includes_all_fields(self):
-        """Test that all AIResponseEvent fields are in published dict"""
+        """Test that all AIResponseEvent fields are preserved"""
         queue = asyncio.Queue()
         publisher = EventPublisher(queue)
         
@@ -220,40 +219,10 @@ class TestEventPublisherPublishAIResponseEvent:
         await publisher.publish(event)
         published = await queue.get()
         
-        assert set(published.keys()) == {
-            "type",
-            "text",
-            "original_message",
-            "detected_intent",
-        }
-
-
-@pytest.mark.unit
-@pytest.mark.asyncio
-class TestEventPublisherPublishDict:
-    """Test EventPublisher publishing plain dict"""
-
-    async def test_publish_dict_directly(self):
-        """Test publishing a plain dict"""
-        queue = asyncio.Queue()
-        publisher = EventPublisher(queue)
-        
-        event_dict = {"type": "custom", "data": "test"}
-        await publisher.publish(event_dict)
-        
-        published = await queue.get()
-        assert published == event_dict
-
-    async def test_publish_dict_passthrough(self):
-        """Test that plain dict is passed through unchanged"""
-        queue = asyncio.Queue()
-        publisher = EventPublisher(queue)
-        
-        original_dict = {"key": "value", "nested": {"data": 123}}
-        await publisher.publish(original_dict)
-        
-        published = await queue.get()
-        assert published == original_dict
+        assert published.type == EVENT_TYPE_AI_RESPONSE
+        assert published.text == "Test response"
+        assert published.original_message == "Test message"
+        assert published.detected_intent == "database"
 
 
 @pytest.mark.unit
@@ -306,8 +275,8 @@ class TestEventPublisherQueueBehavior:
         first = await queue.get()
         second = await queue.get()
         
-        assert first["sender"] == "User 1"
-        assert second["sender"] == "User 2"
+        assert first.sender == "User 1"
+        assert second.sender == "User 2"
 
     async def test_publish_maintains_event_order(self):
         """Test that events are published in order"""
@@ -327,11 +296,12 @@ class TestEventPublisherQueueBehavior:
         
         for i in range(5):
             published = await queue.get()
-            assert published["sender"] == f"User {i}"
+            assert published.sender == f"User {i}"
 
     async def test_publish_with_mocked_queue(self):
-        """Test publish with mocked queue"""
-        queue = AsyncMock()
+        """Test publish with mocked queue takes the non-blocking path"""
+        queue = MagicMock()
+        queue.put = AsyncMock()
         publisher = EventPublisher(queue)
         
         event = UserMessageEvent(
@@ -343,9 +313,24 @@ class TestEventPublisherQueueBehavior:
         
         await publisher.publish(event)
         
-        queue.put.assert_called_once()
-        call_args = queue.put.call_args[0][0]
-        assert call_args["type"] == EVENT_TYPE_USER_MESSAGE
+        queue.put_nowait.assert_called_once()
+        queue.put.assert_not_called()
+        call_args = queue.put_nowait.call_args[0][0]
+        assert call_args.type == EVENT_TYPE_USER_MESSAGE
+
+    async def test_publish_waits_when_queue_full(self):
+        """Test that publish falls back to waiting for space on a full bounded queue"""
+        queue = asyncio.Queue(maxsize=1)
+        publisher = EventPublisher(queue)
+        await publisher.publish(UserMessageEvent(text="first"))
+        
+        pending = asyncio.create_task(publisher.publish(UserMessageEvent(text="second")))
+        await asyncio.sleep(0)
+        assert not pending.done()
+        
+        assert (await queue.get()).text == "first"
+        await asyncio.wait_for(pending, timeout=1)
+        assert (await queue.get()).text == "second"
 
 
 @pytest.mark.unit
@@ -362,7 +347,7 @@ class TestEventPublisherEventTypePreservation:
         await publisher.publish(event)
         
         published = await queue.get()
-        assert published["type"] == EVENT_TYPE_USER_MESSAGE
+        assert published.type == EVENT_TYPE_USER_MESSAGE
 
     async def test_ai_request_event_type_preserved(self):
         """Test AI_REQUEST type is preserved"""
@@ -373,7 +358,7 @@ class TestEventPublisherEventTypePreservation:
         await publisher.publish(event)
         
         published = await queue.get()
-        assert published["type"] == EVENT_TYPE_AI_REQUEST
+        assert published.type == EVENT_TYPE_AI_REQUEST
 
     async def test_ai_response_event_type_preserved(self):
         """Test AI_RESPONSE type is preserved"""
@@ -384,4 +369,4 @@ class TestEventPublisherEventTypePreservation:
         await publisher.publish(event)
         
         published = await queue.get()
-        assert published["type"] == EVENT_TYPE_AI_RESPONSE
+        assert published.type == EVENT_TYPE_AI_RESPONSE
@@ -21,6 +21,15 @@ class TestRateLimiterInitialization:
         assert limiter.WINDOW_SECONDS == 1
         assert limiter.COOLDOWN_SECONDS == 2
 
+    def test_user_state_is_slotted(self):
+        """Test that per-user state is a slotted object, not a dict"""
+        limiter = RateLimiter()
+        limiter.is_rate_limited("user_1")
+        
+        state = limiter.user_limits["user_1"]
+        assert not hasattr(state, "__dict__")
+        assert state.blocked_until is None
+
 
 @pytest.mark.unit
 class TestRateLimiterAllows:
@@ -180,12 +189,26 @@ class TestRateLimiterWindow:
         time.sleep(0.15)
         
         # Reset cooldown so we can test window expiry
-        limiter.user_limits["user_1"]["blocked_until"] = None
+        limiter.user_limits["user_1"].blocked_until = None
         
         # Should still have 2 messages, can add 1 more
         is_limited, error = limiter.is_rate_limited("user_1")
         assert is_limited is False
 
+    def test_window_keeps_at_most_limit_timestamps(self):
+        """Test that expired timestamps are pruned and the window never exceeds the limit"""
+        limiter = RateLimiter(window_seconds=0.05)
+        
+        for _ in range(3):
+            limiter.is_rate_limited("user_1")
+        time.sleep(0.1)
+        limiter.is_rate_limited("user_1")
+        
+        # The three expired entries were dropped before recording the new one
+        timestamps = limiter.user_limits["user_1"].timestamps
+        assert len(timestamps) == 1
+        assert timestamps.maxlen == limiter.MESSAGES_PER_WINDOW
+
 
 @pytest.mark.unit
 class TestRateLimiterStats:
@@ -300,3 +323,28 @@ class TestRateLimiterCleanup:
         # Nothing should be removed
         assert removed == 0
         assert len(limiter.user_limits) == 2
+
+    def test_cleanup_runs_automatically(self):
+        """Test that idle users are evicted every cleanup_every checks"""
+        limiter = RateLimiter(cleanup_every=2, max_idle_seconds=0.05)
+        
+        limiter.is_rate_limited("user_1")
+        time.sleep(0.1)
+        
+        # Second check triggers the sweep before user_2 is tracked
+        limiter.is_rate_limited("user_2")
+        
+        assert list(limiter.user_limits) == ["user_2"]
+
+    def test_cleanup_keeps_users_in_cooldown(self):
+        """Test that a user serving a cooldown is not evicted as idle"""
+        limiter = RateLimiter()
+        
+        for _ in range(4):
+            limiter.is_rate_limited("user_1")
+        
+        removed = limiter.cleanup_old_entries(max_idle_seconds=0)
+        
+        assert removed == 0
+        is_limited, _ = limiter.is_rate_limited("user_1")
+        assert is_limited is True
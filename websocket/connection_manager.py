@@ -1,68 +1,183 @@
 """WebSocket connection management for handling multiple concurrent clients"""
-import json
+import asyncio
+import logging
+from dataclasses import dataclass
+import orjson
 from fastapi import WebSocket
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of frames waiting to be sent to one client. A client that
+# falls this far behind is considered stuck and is closed.
+OUTBOX_SIZE = 256
+
+# Close code sent to a client whose outbox overflowed ("Try Again Later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+
+@dataclass(slots=True)
+class _Client:
+    """Per-connection send state: pending frames and the task draining them"""
+    outbox: asyncio.Queue[str]
+    writer: asyncio.Task | None = None
+    # Broadcasts set aside while the connection is held (see connect())
+    held: list[str] | None = None
+
 
 class ConnectionManager:
-    """Manages WebSocket connections with lifecycle and broadcast support"""
+    """Manages WebSocket connections with lifecycle and broadcast support
+
+    Every connection gets a bounded outbox queue drained by its own writer
+    task. Broadcasting only enqueues, so a slow client never holds up the
+    event consumer or the other clients.
+    """
 
     def __init__(self) -> None:
-        """Initialize connection manager with empty active connections"""
-        self.active_connections: list[WebSocket] = []
+        """Initialize connection manager with no connections"""
+        # Insertion-ordered, so iteration follows connection order
+        self._clients: dict[WebSocket, _Client] = {}
+        # Close calls for slow clients still in flight (kept referenced)
+        self._closing: set[asyncio.Task] = set()
+
+    @property
+    def active_connections(self) -> list[WebSocket]:
+        """Snapshot of the connected WebSockets, in connection order"""
+        return list(self._clients)
 
-    async def connect(self, websocket: WebSocket) -> None:
-        """Accept and track a new WebSocket connection"""
+    async def connect(self, websocket: WebSocket, hold: bool = False) -> None:
+        """Accept and track a new WebSocket connection, starting its writer
+
+        Args:
+            websocket: Connection to accept
+            hold: Set broadcasts aside until release(), so frames queued with
+                send_text() meanwhile (e.g. a greeting and history) go out first
+        """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = _Client(asyncio.Queue(maxsize=OUTBOX_SIZE), held=[] if hold else None)
+        self._clients[websocket] = client
+        client.writer = asyncio.create_task(self._writer(websocket, client.outbox))
+
+    def release(self, websocket: WebSocket) -> None:
+        """Queue the broadcasts held since connect(hold=True) and stop holding"""
+        client = self._clients.get(websocket)
+        if client is None or client.held is None:
+            return
+        held, client.held = client.held, None
+        for message_text in held:
+            if not self._enqueue(websocket, client, message_text):
+                return
+
+    async def send_text(self, websocket: WebSocket, message_text: str) -> None:
+        """Queue a text frame for one client, in order with its broadcasts
+
+        Frames for a connection are only ever sent by its writer task; a
+        socket that is no longer connected is ignored.
+        """
+        client = self._clients.get(websocket)
+        if client is not None:
+            self._enqueue(websocket, client, message_text)
 
     def disconnect(self, websocket: WebSocket) -> None:
-        """Remove a WebSocket connection from active connections"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        """Remove a WebSocket connection and stop its writer"""
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+
+        if client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+        # Discard unsent frames so flush() doesn't wait on them
+        while not client.outbox.empty():
+            client.outbox.get_nowait()
+            client.outbox.task_done()
+
+    async def _writer(self, websocket: WebSocket, outbox: asyncio.Queue[str]) -> None:
+        """Send queued frames to one client, one at a time, until it fails"""
+        while True:
+            message_text = await outbox.get()
+            try:
+                await websocket.send_text(message_text)
+            except Exception as e:
+                logger.warning("Error sending message to client: %s", e)
+                outbox.task_done()
+                self.disconnect(websocket)
+                return
+            outbox.task_done()
 
     async def broadcast(self, message: dict) -> None:
         """Send a message to all connected clients
-        
+
         Args:
             message: Dictionary to be JSON-serialized and sent to all clients
         """
-        message_text = json.dumps(message)
-        disconnected: list[WebSocket] = []
-        
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message_text)
-            except Exception as e:
-                print(f"Error sending message to client: {e}")
-                disconnected.append(connection)
-        
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+        if not self._clients:
+            return  # Nobody to send to: skip serializing
+        await self.broadcast_text(orjson.dumps(message).decode())
 
     async def broadcast_except(self, message: dict, exclude: WebSocket) -> None:
         """Send a message to all connected clients except one
-        
+
         Args:
             message: Dictionary to be JSON-serialized and sent
             exclude: WebSocket connection to exclude from broadcast
         """
-        message_text = json.dumps(message)
-        disconnected: list[WebSocket] = []
-        
-        for connection in self.active_connections:
-            if connection == exclude:
+        if not self._clients or (len(self._clients) == 1 and exclude in self._clients):
+            return  # Only the sender (or nobody) is connected: skip serializing
+        await self.broadcast_text(orjson.dumps(message).decode(), exclude)
+
+    async def broadcast_text(self, message_text: str, exclude: WebSocket | None = None) -> None:
+        """Queue an already serialized JSON payload for all clients (except one)
+
+        The payload is encoded once by the caller and the same string is put
+        on every connection's outbox without waiting; the writer tasks do the
+        actual sends. Held connections collect it until release(). Clients
+        whose outbox is full are closed.
+
+        Args:
+            message_text: JSON text frame to send
+            exclude: Optional WebSocket connection to skip
+        """
+        # Iterate a snapshot: closing a slow client mutates the dict
+        for connection, client in tuple(self._clients.items()):
+            if connection is exclude:
                 continue
-            try:
-                await connection.send_text(message_text)
-            except Exception as e:
-                print(f"Error sending message to client: {e}")
-                disconnected.append(connection)
-        
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+            if client.held is None:
+                self._enqueue(connection, client, message_text)
+            elif len(client.held) < OUTBOX_SIZE:
+                client.held.append(message_text)
+            else:
+                logger.warning("Closing slow client: %d frames pending", OUTBOX_SIZE)
+                self._close_slow(connection)
+
+    def _enqueue(self, websocket: WebSocket, client: _Client, message_text: str) -> bool:
+        """Put a frame on a client's outbox, closing the client if it is full"""
+        try:
+            client.outbox.put_nowait(message_text)
+        except asyncio.QueueFull:
+            logger.warning("Closing slow client: %d frames pending", OUTBOX_SIZE)
+            self._close_slow(websocket)
+            return False
+        return True
+
+    def _close_slow(self, websocket: WebSocket) -> None:
+        """Drop a client that can't keep up and close its socket"""
+        self.disconnect(websocket)
+        task = asyncio.create_task(self._close(websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket) -> None:
+        """Close a WebSocket, ignoring errors from an already dead connection"""
+        try:
+            await websocket.close(code=SLOW_CLIENT_CLOSE_CODE)
+        except Exception:
+            pass
+
+    async def flush(self) -> None:
+        """Wait until every frame queued so far has been sent (or dropped)"""
+        await asyncio.gather(*(client.outbox.join() for client in tuple(self._clients.values())))
 
     def get_connection_count(self) -> int:
         """Get the number of active connections"""
-        return len(self.active_connections)
+        return len(self._clients)
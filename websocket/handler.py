@@ -1,29 +1,38 @@
 """WebSocket connection handling and message parsing"""
-import json
+import logging
+import orjson
 from fastapi import WebSocket, WebSocketDisconnect
 
-from domain.constants import EVENT_TYPE_AI_REQUEST, EVENT_TYPE_USER_MESSAGE, CONVERSATION_DEFAULT
+from domain.constants import AIBOT_PREFIX, EVENT_TYPE_AI_REQUEST, EVENT_TYPE_USER_MESSAGE, CONVERSATION_DEFAULT
 from domain.models import UserMessageEvent, AIRequestEvent
 from database.chat_database import ChatDatabase
 from events.publisher import EventPublisher
 from websocket.connection_manager import ConnectionManager
 from websocket.rate_limiter import rate_limiter
 
+logger = logging.getLogger(__name__)
 
-def parse_message_event(websocket: WebSocket, user_id: str, sender: str, message: str) -> UserMessageEvent | AIRequestEvent:
-    """Parse incoming message and determine event type"""
-    data: dict[str, str] = json.loads(message)
-    msg_type: str = data.get("type", "message").strip()
+_AIBOT_PREFIX_LEN = len(AIBOT_PREFIX)
+
+# Fixed reply to an undecodable frame, encoded once at import
+_INVALID_JSON_FRAME = orjson.dumps({
+    "type": "error",
+    "message": "Invalid JSON format"
+}).decode()
+
+
+def parse_message_event(websocket: WebSocket, user_id: str, sender: str, data: dict) -> UserMessageEvent | AIRequestEvent:
+    """Build the event for an already decoded message and determine its type"""
     text: str = data.get("text", "")
     
-    # Check if message is an AI request
-    if text.startswith("/AIBot"):
+    # Check if message is an AI request; only the leading prefix is removed
+    if text.startswith(AIBOT_PREFIX):
         return AIRequestEvent(
             type=EVENT_TYPE_AI_REQUEST,
             sender_ws=websocket,
             user_id=user_id,
             sender=sender,
-            text=text.replace("/AIBot", "").strip()
+            text=text[_AIBOT_PREFIX_LEN:].strip()
         )
     else:
         return UserMessageEvent(
@@ -35,9 +44,9 @@ def parse_message_event(websocket: WebSocket, user_id: str, sender: str, message
         )
 
 
-async def process_message(websocket: WebSocket, user_id: str, sender: str, message: str, publisher) -> None:
+async def process_message(websocket: WebSocket, user_id: str, sender: str, data: dict, publisher) -> None:
     """Process incoming message and publish to event queue"""
-    event = parse_message_event(websocket, user_id, sender, message)
+    event = parse_message_event(websocket, user_id, sender, data)
     await publisher.publish(event)
 
 
@@ -54,8 +63,9 @@ async def handle_websocket_connection(websocket: WebSocket, db: ChatDatabase, pu
             await websocket.close(code=1008, reason="Username required. Connect with: ws://localhost:8765/ws?username=YourName")
             return
         
-        # Accept connection and add to manager
-        await connection_manager.connect(websocket)
+        # Accept connection and add to manager. Broadcasts are held back until
+        # the greeting and history below are queued, so they arrive first.
+        await connection_manager.connect(websocket, hold=True)
         
         # Get or create user
         user_id = await db.get_or_create_user(username)
@@ -63,28 +73,33 @@ async def handle_websocket_connection(websocket: WebSocket, db: ChatDatabase, pu
         # Add user to default conversation
         await db.add_user_to_conversation(user_id, CONVERSATION_DEFAULT)
         
-        print(f"User '{username}' (ID: {user_id}) connected. Total clients: {connection_manager.get_connection_count()}")
+        logger.info("User '%s' (ID: %s) connected. Total clients: %d", username, user_id, connection_manager.get_connection_count())
         
-        # Send connection success
-        await websocket.send_text(json.dumps({
+        # Send connection success. Every frame goes through the client's
+        # outbox, so only its writer task ever sends on the socket.
+        await connection_manager.send_text(websocket, orjson.dumps({
             "type": "connected",
             "user_id": user_id,
             "username": username
-        }))
+        }).decode())
         
-        # Send full conversation history (all messages from all users)
-        history = await db.get_conversation_history_dict(CONVERSATION_DEFAULT)
-        await websocket.send_text(json.dumps({
+        # Send full conversation history (all messages from all users).
+        # orjson encodes the HistoryMessage dataclasses directly, no dict copies.
+        history = await db.get_conversation_history(CONVERSATION_DEFAULT)
+        await connection_manager.send_text(websocket, orjson.dumps({
             "type": "history",
             "messages": history,
             "count": len(history)
-        }))
+        }).decode())
+        
+        # Now let broadcasts through, after the history
+        connection_manager.release(websocket)
         
         # Now listen for messages - all are regular chat messages
         while True:
             message = await websocket.receive_text()
             try:
-                msg_data: dict = json.loads(message)
+                msg_data: dict = orjson.loads(message)
                 text: str = msg_data.get("text", "").strip()
                 
                 if not text:
@@ -93,33 +108,26 @@ async def handle_websocket_connection(websocket: WebSocket, db: ChatDatabase, pu
                 # Check rate limit BEFORE processing
                 is_limited, error_msg = rate_limiter.is_rate_limited(user_id)
                 if is_limited:
-                    try:
-                        await websocket.send_text(json.dumps({
-                            "type": "error",
-                            "code": "RATE_LIMITED",
-                            "message": error_msg
-                        }))
-                    except Exception as e:
-                        print(f"Error sending rate limit message: {e}")
+                    await connection_manager.send_text(websocket, orjson.dumps({
+                        "type": "error",
+                        "code": "RATE_LIMITED",
+                        "message": error_msg
+                    }).decode())
                     continue
                 
-                # Process and publish message
-                await process_message(websocket, user_id, username, message, publisher)
+                # Process and publish message (the frame was decoded once above)
+                await process_message(websocket, user_id, username, msg_data, publisher)
                 
-            except json.JSONDecodeError:
-                print(f"Invalid JSON received from {username}")
+            except orjson.JSONDecodeError:
+                logger.warning("Invalid JSON received from %s", username)
                 # Send error but don't close connection - client can recover
-                try:
-                    await websocket.send_text(json.dumps({
-                        "type": "error",
-                        "message": "Invalid JSON format"
-                    }))
-                except Exception as e:
-                    print(f"Error sending error message: {e}")
+                await connection_manager.send_text(websocket, _INVALID_JSON_FRAME)
                     
     except WebSocketDisconnect:
-        print(f"Client '{username}' disconnected. Total clients: {connection_manager.get_connection_count() - 1}")
-        connection_manager.disconnect(websocket)
+        logger.info("Client '%s' disconnected. Total clients: %d", username, connection_manager.get_connection_count() - 1)
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
+    finally:
+        # Always untrack the socket (also on cancellation) so neither it nor
+        # its writer task outlives the connection
         connection_manager.disconnect(websocket)
@@ -1,12 +1,37 @@
-"""Rate limiting for WebSocket messages using token bucket algorithm"""
+"""Rate limiting for WebSocket messages using a sliding-window algorithm"""
 import time
-from typing import Dict, List
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class _UserLimit:
+    """Per-user limiter state: recent message times and any active cooldown"""
+    timestamps: deque[float]
+    blocked_until: float | None = None
 
 
 class RateLimiter:
-    """In-memory token bucket rate limiter for per-user message limiting"""
+    """In-memory sliding-window rate limiter for per-user message limiting
+    
+    Not locked: all methods are synchronous and only called from the event
+    loop thread, so each check-and-update runs without interleaving. Calling
+    it from other threads (or a free-threaded build) would need a lock.
+    """
     
-    def __init__(self, messages_per_window: int = 3, window_seconds: float = 1.0, cooldown_seconds: float = 2.0) -> None:
+    __slots__ = (
+        "MESSAGES_PER_WINDOW", "WINDOW_SECONDS", "COOLDOWN_SECONDS", "CLEANUP_EVERY", "MAX_IDLE_SECONDS",
+        "_cooldown_message", "_calls_since_cleanup", "user_limits",
+    )
+    
+    def __init__(
+        self,
+        messages_per_window: int = 3,
+        window_seconds: float = 1.0,
+        cooldown_seconds: float = 2.0,
+        cleanup_every: int = 10_000,
+        max_idle_seconds: float = 3600,
+    ) -> None:
         """
         Initialize rate limiter with configurable limits.
         
@@ -14,13 +39,28 @@ class RateLimiter:
             messages_per_window: Number of messages allowed in the window
             window_seconds: Time window in seconds
             cooldown_seconds: Cooldown period after exceeding limit
+            cleanup_every: Drop idle users after this many checks
+            max_idle_seconds: Inactivity after which a user counts as idle
         """
         self.MESSAGES_PER_WINDOW = messages_per_window
         self.WINDOW_SECONDS = window_seconds
         self.COOLDOWN_SECONDS = cooldown_seconds
-        
-        # Structure: {user_id: {"timestamps": [t1, t2, ...], "blocked_until": float | None}}
-        self.user_limits: Dict[str, dict] = {}
+        self.CLEANUP_EVERY = cleanup_every
+        self.MAX_IDLE_SECONDS = max_idle_seconds
+        self._calls_since_cleanup = 0
+        # Reply when a user trips the limit; the cooldown is fixed, so build it once
+        self._cooldown_message = f"Too many messages. Try again in {cooldown_seconds} second(s)."
+        
+        # One slotted _UserLimit per user (no per-user dict)
+        # Times come from time.monotonic(), so wall-clock jumps (NTP, DST) can
+        # neither release nor freeze a user. Timestamps are appended in time
+        # order, so expired ones sit on the left.
+        self.user_limits: dict[str, _UserLimit] = {}
+    
+    def _new_entry(self) -> _UserLimit:
+        """Create empty tracking state for one user"""
+        # Never holds more than the limit: a message is only recorded when under it
+        return _UserLimit(deque(maxlen=self.MESSAGES_PER_WINDOW))
     
     def is_rate_limited(self, user_id: str) -> tuple[bool, str | None]:
         """
@@ -31,44 +71,58 @@ class RateLimiter:
             - is_limited: True if user should be blocked
             - error_message: User-friendly error message or None if allowed
         """
-        now = time.time()
+        now = time.monotonic()
+        
+        # Evict idle users now and then, so memory stays bounded without an
+        # external scheduler calling cleanup_old_entries()
+        self._calls_since_cleanup += 1
+        if self._calls_since_cleanup >= self.CLEANUP_EVERY:
+            self._calls_since_cleanup = 0
+            self.cleanup_old_entries(self.MAX_IDLE_SECONDS)
         
         # Initialize user if not tracked yet
-        if user_id not in self.user_limits:
-            self.user_limits[user_id] = {
-                "timestamps": [],
-                "blocked_until": None
-            }
+        user_data = self.user_limits.get(user_id)
+        if user_data is None:
+            user_data = self.user_limits[user_id] = self._new_entry()
         
-        user_data = self.user_limits[user_id]
+        timestamps = user_data.timestamps
         
         # Check if user is in cooldown period
-        if user_data["blocked_until"] is not None:
-            if now < user_data["blocked_until"]:
-                retry_after = int(user_data["blocked_until"] - now) + 1
+        if user_data.blocked_until is not None:
+            if now < user_data.blocked_until:
+                retry_after = int(user_data.blocked_until - now) + 1
                 return True, f"Rate limited. Try again in {retry_after} second(s)."
             else:
                 # Cooldown expired, reset
-                user_data["blocked_until"] = None
-                user_data["timestamps"] = []
+                user_data.blocked_until = None
+                timestamps.clear()
         
-        # Remove timestamps older than window
+        # Fast path: with fewer than the limit recorded the message is allowed
+        # whatever has expired, so pruning can wait until the window is full
+        if len(timestamps) < self.MESSAGES_PER_WINDOW:
+            timestamps.append(now)
+            return False, None
+        
+        # Remove timestamps older than window (oldest first, in place)
         cutoff = now - self.WINDOW_SECONDS
-        user_data["timestamps"] = [ts for ts in user_data["timestamps"] if ts > cutoff]
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
         
         # Check if under limit
-        if len(user_data["timestamps"]) < self.MESSAGES_PER_WINDOW:
+        if len(timestamps) < self.MESSAGES_PER_WINDOW:
             # Allow message and record timestamp
-            user_data["timestamps"].append(now)
+            timestamps.append(now)
             return False, None
         else:
             # Exceeded limit - activate cooldown
-            user_data["blocked_until"] = now + self.COOLDOWN_SECONDS
-            retry_after = self.COOLDOWN_SECONDS
-            return True, f"Too many messages. Try again in {retry_after} second(s)."
+            user_data.blocked_until = now + self.COOLDOWN_SECONDS
+            return True, self._cooldown_message
     
     def get_user_stats(self, user_id: str) -> dict:
-        """Get current rate limit stats for a user (for monitoring)"""
+        """Get current rate limit stats for a user (for monitoring)
+        
+        blocked_until is on the time.monotonic() clock, not a wall-clock time.
+        """
         if user_id not in self.user_limits:
             return {
                 "user_id": user_id,
@@ -79,50 +133,48 @@ class RateLimiter:
             }
         
         user_data = self.user_limits[user_id]
-        now = time.time()
+        now = time.monotonic()
         
-        # Clean up old timestamps
+        # Count timestamps still inside the window (without modifying state)
         cutoff = now - self.WINDOW_SECONDS
-        valid_timestamps = [ts for ts in user_data["timestamps"] if ts > cutoff]
+        messages_in_window = sum(1 for ts in user_data.timestamps if ts > cutoff)
         
         is_blocked = (
-            user_data["blocked_until"] is not None 
-            and now < user_data["blocked_until"]
+            user_data.blocked_until is not None 
+            and now < user_data.blocked_until
         )
         
         return {
             "user_id": user_id,
-            "messages_in_window": len(valid_timestamps),
+            "messages_in_window": messages_in_window,
             "limit": self.MESSAGES_PER_WINDOW,
             "is_blocked": is_blocked,
-            "blocked_until": user_data["blocked_until"]
+            "blocked_until": user_data.blocked_until
         }
     
     def reset_user(self, user_id: str) -> None:
         """Reset rate limit for a user (admin function)"""
         if user_id in self.user_limits:
-            self.user_limits[user_id] = {
-                "timestamps": [],
-                "blocked_until": None
-            }
+            self.user_limits[user_id] = self._new_entry()
     
-    def cleanup_old_entries(self, max_idle_seconds: int = 3600) -> int:
+    def cleanup_old_entries(self, max_idle_seconds: float = 3600) -> int:
         """
         Clean up user entries that haven't had activity in max_idle_seconds.
-        Useful for long-running servers to prevent memory bloat.
+        Runs automatically every CLEANUP_EVERY checks; users still in a
+        cooldown are kept.
         
         Returns: Number of users cleaned up
         """
-        now = time.time()
+        now = time.monotonic()
         users_to_remove = []
         
         for user_id, user_data in self.user_limits.items():
-            if user_data["timestamps"]:
-                last_activity = max(user_data["timestamps"])
-            else:
-                last_activity = 0
-            
-            if (now - last_activity) > max_idle_seconds:
+            if user_data.blocked_until is not None and now < user_data.blocked_until:
+                continue
+            timestamps = user_data.timestamps
+            # The newest timestamp is last. Users with no recorded messages are
+            # always idle (the monotonic clock has no fixed zero to measure from).
+            if not timestamps or (now - timestamps[-1]) > max_idle_seconds:
                 users_to_remove.append(user_id)
         
         for user_id in users_to_remove: